@@ -0,0 +1,240 @@
+#----------------------------------------------------------------------------#
+# JSON API.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+import orjson
+from flask import Blueprint, current_app, request, abort, url_for
+
+from conditional import conditional, table_versions, booking_versions
+from extensions import page_cache
+from models import db, Venue, Artist, Show
+from shows import parse_show_cursor, shows_version
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# The columns each resource exposes. ?fields=name,city selects only those
+# (the id always comes back), and ?fields[shows]=start_time does the same
+# for the embedded resources.
+RESOURCES = {
+  'venues': (Venue, ('id', 'name', 'genres', 'address', 'city', 'state', 'phone', 'website',
+                     'facebook_link', 'seeking_talent', 'seeking_description', 'image_link',
+                     'timezone', 'updated_at')),
+  'artists': (Artist, ('id', 'name', 'genres', 'city', 'state', 'phone', 'website',
+                       'facebook_link', 'seeking_venue', 'seeking_description', 'image_link',
+                       'updated_at')),
+  'shows': (Show, ('id', 'start_time', 'end_time', 'venue_id', 'artist_id', 'updated_at')),
+}
+
+
+def json_response(data, status=200):
+  # orjson writes datetimes, aware or not, as ISO 8601 itself.
+  return current_app.response_class(orjson.dumps(data), status=status, mimetype='application/json')
+
+@bp.errorhandler(400)
+@bp.errorhandler(404)
+def api_error(error):
+  return json_response({'error': error.description}, error.code)
+
+
+def fieldset(kind, embedded=False):
+  """Names of the requested columns of ``kind``, the id first."""
+  allowed = RESOURCES[kind][1]
+  value = request.args.get('fields[%s]' % kind)
+  if value is None and not embedded:
+    value = request.args.get('fields')
+  if not value:
+    return list(allowed)
+  names = ['id'] + [name for name in value.split(',') if name != 'id']
+  unknown = [name for name in names if name not in allowed]
+  if unknown:
+    abort(400, 'Unknown %s fields: %s' % (kind, ', '.join(unknown)))
+  return names
+
+def columns(kind, names):
+  model = RESOURCES[kind][0]
+  return [getattr(model, name) for name in names]
+
+def includes(allowed):
+  names = [name for name in request.args.get('include', '').split(',') if name]
+  unknown = [name for name in names if name not in allowed]
+  if unknown:
+    abort(400, 'Cannot include: %s' % ', '.join(unknown))
+  return names
+
+def page_size():
+  limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+  if not 1 <= limit <= current_app.config['API_MAX_PAGE_SIZE']:
+    abort(400, 'limit must be between 1 and %d' % current_app.config['API_MAX_PAGE_SIZE'])
+  return limit
+
+def next_url(after):
+  args = request.args.to_dict()
+  args.update(request.view_args, after=after)
+  return url_for(request.endpoint, **args)
+
+
+def embed_shows(data, column, tag):
+  """Adds its shows to each venue or artist of ``data``, from one query."""
+  names = fieldset('shows', embedded=True)
+  shows = {}
+  ids = [item['id'] for item in data]
+  if ids:
+    rows = db.session.query(column, *columns('shows', names)) \
+      .filter(column.in_(ids)) \
+      .order_by(Show.start_time, Show.id)
+    for row in rows:
+      shows.setdefault(row[0], []).append(dict(zip(names, row[1:])))
+  for item in data:
+    page_cache.tag(tag % item['id'])
+    item['shows'] = shows.get(item['id'], [])
+
+def embed(data, rows, kind, key, field):
+  """Sets ``field`` of each show of ``data`` to the venue or artist its
+  ``key`` names, loaded by one query."""
+  names = fieldset(kind, embedded=True)
+  ids = sorted(set(getattr(row, key) for row in rows))
+  related = {}
+  if ids:
+    model = RESOURCES[kind][0]
+    for row in db.session.query(*columns(kind, names)).filter(model.id.in_(ids)):
+      related[row.id] = dict(zip(names, row))
+  for item, row in zip(data, rows):
+    page_cache.tag('%s:%d' % (field, getattr(row, key)))
+    item[field] = related.get(getattr(row, key))
+
+
+def entity_list(kind, show_column):
+  """A page of venues or artists in id order; ?after= is the last id seen."""
+  model = RESOURCES[kind][0]
+  names = fieldset(kind)
+  include = includes(('shows',))
+  limit = page_size()
+  query = db.session.query(*columns(kind, names))
+  after = request.args.get('after')
+  if after is not None:
+    try:
+      query = query.filter(model.id>int(after))
+    except ValueError:
+      abort(400, 'Malformed cursor')
+  rows = query.order_by(model.id).limit(limit + 1).all()
+
+  data = [dict(zip(names, row)) for row in rows[:limit]]
+  if 'shows' in include:
+    embed_shows(data, show_column, kind[:-1] + ':%d:shows')
+  return json_response({
+    'data': data,
+    'next': next_url(rows[limit - 1].id) if len(rows) > limit else None
+  })
+
+def entity(kind, entity_id, show_column):
+  model = RESOURCES[kind][0]
+  names = fieldset(kind)
+  include = includes(('shows',))
+  row = db.session.query(*columns(kind, names)).filter(model.id==entity_id).first()
+  if row is None:
+    abort(404, 'No %s with ID %d' % (kind[:-1], entity_id))
+  data = [dict(zip(names, row))]
+  if 'shows' in include:
+    embed_shows(data, show_column, kind[:-1] + ':%d:shows')
+  return json_response({'data': data[0]})
+
+
+#  Venues
+#  ----------------------------------------------------------------
+
+@bp.route('/venues')
+@conditional(lambda: table_versions('Show', 'Venue'))
+@page_cache.cached('list:venues', 'list:shows')
+def venues():
+  return entity_list('venues', Show.venue_id)
+
+@bp.route('/venues/<int:venue_id>')
+@conditional(lambda venue_id: booking_versions(Venue, Show.venue_id, Artist, Show.artist_id, venue_id))
+@page_cache.cached('venue:{venue_id}', 'venue:{venue_id}:shows')
+def venue(venue_id):
+  return entity('venues', venue_id, Show.venue_id)
+
+#  Artists
+#  ----------------------------------------------------------------
+
+@bp.route('/artists')
+@conditional(lambda: table_versions('Artist', 'Show'))
+@page_cache.cached('list:artists', 'list:shows')
+def artists():
+  return entity_list('artists', Show.artist_id)
+
+@bp.route('/artists/<int:artist_id>')
+@conditional(lambda artist_id: booking_versions(Artist, Show.artist_id, Venue, Show.venue_id, artist_id))
+@page_cache.cached('artist:{artist_id}', 'artist:{artist_id}:shows')
+def artist(artist_id):
+  return entity('artists', artist_id, Show.artist_id)
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def embed_related(data, rows):
+  include = includes(('venue', 'artist'))
+  if 'venue' in include:
+    embed(data, rows, 'venues', 'venue_id', 'venue')
+  if 'artist' in include:
+    embed(data, rows, 'artists', 'artist_id', 'artist')
+
+@bp.route('/shows')
+@conditional(shows_version)
+@page_cache.cached('list:shows')
+def shows():
+  """The /shows feed: same filters and cursors, upcoming and all shows in
+  start order, past shows most recent first."""
+  when = request.args.get('when')
+  venue_id = request.args.get('venue_id', type=int)
+  artist_id = request.args.get('artist_id', type=int)
+  cursor = request.args.get('after')
+  limit = page_size()
+
+  # The cursor and the embedded entities need these even when not requested.
+  names = fieldset('shows')
+  selected = names + [name for name in ('start_time', 'venue_id', 'artist_id') if name not in names]
+  query = db.session.query(*columns('shows', selected))
+  if when == 'upcoming':
+    query = query.filter(Show.start_time>datetime.now())
+  elif when == 'past':
+    query = query.filter(Show.start_time<datetime.now())
+  if venue_id is not None:
+    query = query.filter(Show.venue_id==venue_id)
+  if artist_id is not None:
+    query = query.filter(Show.artist_id==artist_id)
+
+  position = db.tuple_(Show.start_time, Show.id)
+  descending = when == 'past'
+  if cursor:
+    last_seen = db.tuple_(*parse_show_cursor(cursor))
+    query = query.filter(position<last_seen if descending else position>last_seen)
+  if descending:
+    query = query.order_by(Show.start_time.desc(), Show.id.desc())
+  else:
+    query = query.order_by(Show.start_time, Show.id)
+  rows = query.limit(limit + 1).all()
+
+  more = len(rows) > limit
+  rows = rows[:limit]
+  data = [dict(zip(names, row)) for row in rows]
+  embed_related(data, rows)
+  return json_response({
+    'data': data,
+    'next': next_url('%s_%d' % (rows[-1].start_time.isoformat(), rows[-1].id)) if more else None
+  })
+
+@bp.route('/shows/<int:show_id>')
+@conditional(lambda show_id: table_versions('Artist', 'Show', 'Venue'))
+@page_cache.cached('list:shows')
+def show(show_id):
+  names = fieldset('shows')
+  selected = names + [name for name in ('venue_id', 'artist_id') if name not in names]
+  row = db.session.query(*columns('shows', selected)).filter(Show.id==show_id).first()
+  if row is None:
+    abort(404, 'No show with ID %d' % show_id)
+  data = [dict(zip(names, row))]
+  embed_related(data, [row])
+  return json_response({'data': data[0]})
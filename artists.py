@@ -0,0 +1,233 @@
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort, jsonify
+
+from conditional import conditional, table_versions, booking_versions
+from dates import format_datetimes
+from extensions import page_cache, replica_router
+from facets import artist_genres, genre_filter
+from models import db, Venue, Artist, Show, ShowCard
+from removal import remove, requested_ids
+from search import find_artists
+from shows import calendar_range, calendar
+from typeahead import artist_names
+
+bp = Blueprint('artists', __name__)
+
+
+def artist_version(artist_id):
+  return booking_versions(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+
+
+@bp.route('/artists')
+@conditional(lambda: table_versions('Artist'))
+@page_cache.cached('list:artists')
+def artists():
+  genres = request.args.getlist('genre')
+  artists = db.session.query(Artist)
+  if genres:
+    artists = artists.filter(genre_filter(Artist, genres))
+  data = []
+  for artist in artists:
+    data.append({
+      'id':artist.id,
+      'name':artist.name,
+      })
+  return render_template('pages/artists.html', artists=data, genres=artist_genres.counts(), selected_genres=genres,
+                         filters={})
+
+@bp.route('/artists/genres')
+@conditional(lambda: table_versions('Artist'))
+@page_cache.cached('list:artists')
+def artist_genre_counts():
+  counts = artist_genres.counts(request.args.get('city'), request.args.get('state'))
+  return jsonify(genres=[{'genre': genre, 'count': count} for genre, count in counts])
+
+@bp.route('/artists/search', methods=['POST'])
+@replica_router.read_only
+def search_artists():
+  search_term = request.form.get('search_term', '')
+  response = find_artists(search_term, current_app.config['SEARCH_RESULTS_LIMIT'])
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
+
+@bp.route('/artists/typeahead')
+def artist_typeahead():
+  return jsonify(data=artist_names.search(request.args.get('q', '')))
+
+@bp.route('/artists/<int:artist_id>')
+@conditional(artist_version)
+@page_cache.cached('artist:{artist_id}', 'artist:{artist_id}:shows')
+def show_artist(artist_id):
+  # The artist and the cards of its shows come back in one outer join.
+  rows = db.session.query(Artist, ShowCard) \
+    .outerjoin(ShowCard, ShowCard.artist_id==Artist.id) \
+    .filter(Artist.id==artist_id) \
+    .order_by(ShowCard.start_time) \
+    .all()
+  if not rows:
+    abort(404)
+  artist = rows[0][0]
+
+  now = datetime.now()
+  upcoming_shows = []
+  past_shows = []
+  shows = [card for _, card in rows if card is not None]
+  start_times = format_datetimes([show.start_time for show in shows], 'full', [show.venue_timezone for show in shows])
+  for show, formatted_start_time in zip(shows, start_times):
+    page_cache.tag('venue:%d' % show.venue_id)
+    show_data = {
+      "venue_id": show.venue_id,
+      "venue_image_link": show.venue_image_link,
+      "venue_name": show.venue_name,
+      "start_time": show.start_time,
+      "formatted_start_time": formatted_start_time
+    }
+    if show.start_time > now:
+      upcoming_shows.append(show_data)
+    elif show.start_time < now:
+      past_shows.append(show_data)
+
+  data = {
+    "id" : artist.id,
+    "name": artist.name,
+    "genres": artist.genres,
+    "city":artist.city,
+    "state":artist.state,
+    "phone": artist.phone,
+    "website": artist.website,
+    "facebook_link": artist.facebook_link,
+    "seeking_venue": artist.seeking_venue,
+    "seeking_description": artist.seeking_description,
+    "image_link":artist.image_link,
+    "upcoming_shows": upcoming_shows,
+    "past_shows": past_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows)
+  }
+
+  return render_template('pages/show_artist.html', artist=data)
+
+@bp.route('/artists/<int:artist_id>/calendar')
+@page_cache.cached('artist:{artist_id}', 'artist:{artist_id}:shows')
+def artist_calendar(artist_id):
+  start, end = calendar_range()
+  shows = calendar(Show.artist_id, artist_id, start, end)
+  if not shows and Artist.query.get(artist_id) is None:
+    abort(404)
+  return jsonify({'artist_id': artist_id, 'from': start.isoformat(), 'to': end.isoformat(), 'shows': shows})
+
+#  Delete
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/<int:artist_id>', methods=['DELETE'])
+def delete_artist(artist_id):
+  artist = Artist.query.get(artist_id)
+  if artist is None:
+    abort(404)
+  name = artist.name
+  try:
+    remove('artists', [artist_id])
+  except:
+    flash('An error occurred. Artist ' + str(name) + ' could not be deleted.')
+    abort(500)
+  flash('Artist ' + str(name) + ' successfully deleted.')
+  return render_template('pages/home.html')
+
+@bp.route('/artists', methods=['DELETE'])
+def delete_artists():
+  # Bulk removal: {"ids": [...]} in one set-based transaction.
+  return jsonify(removed=remove('artists', requested_ids()))
+
+#  Update
+#  ----------------------------------------------------------------
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  artist = db.session.query(Artist).filter(Artist.id == artist_id).all()[0]
+  form = ArtistForm(obj=artist) #Populate form with artist information
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  from forms import ArtistForm
+  artist = Artist.query.filter_by(id=artist_id).first()
+  form = ArtistForm(request.form)
+  error = False
+  try:
+    artist.name = form.name.data
+    artist.city = form.city.data
+    artist.state = form.state.data
+    artist.phone = form.phone.data
+    artist.genres = form.genres.data
+    artist.website = form.website.data
+    artist.facebook_link = form.facebook_link.data
+    artist.seeking_venue = form.seeking_venue.data
+    artist.seeking_description = form.seeking_description.data
+    artist.image_link = form.image_link.data
+    db.session.commit()
+    artist_names.put(artist.id, artist.name)
+    page_cache.invalidate('artist:%d' % artist.id, 'list:artists')
+    flash('Artist ' + request.form['name'] + ' was successfully updated!')
+
+  except:
+    db.session.rollback()
+    flash('Unable to update Artist : ' + request.form['name'] + '!')
+
+    error = True
+  finally:
+    db.session.close()
+  if error:
+    abort(500)
+  else:
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  from forms import ArtistForm
+  form = ArtistForm(request.form)
+
+  error = False
+  try:
+    artist = Artist(
+      name = form.name.data,
+      city = form.city.data,
+      state = form.state.data,
+      phone = form.phone.data,
+      genres = form.genres.data,
+      website = form.website.data,
+      facebook_link = form.facebook_link.data,
+      seeking_venue = form.seeking_venue.data,
+      seeking_description = form.seeking_description.data,
+      image_link = form.image_link.data
+    )
+    db.session.add(artist)
+    db.session.commit()
+    artist_id = artist.id
+    artist_names.put(artist.id, artist.name)
+    page_cache.invalidate('list:artists')
+  except:
+    db.session.rollback()
+    error = True
+  finally:
+    db.session.close()
+  if error:
+    flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+    return render_template('pages/home.html')
+  else:
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    return redirect(url_for('artists.show_artist', artist_id=artist_id))
+
+
@@ -0,0 +1,235 @@
+#----------------------------------------------------------------------------#
+# Static assets.
+#
+# `flask build-assets` writes bundled, minified and fingerprinted copies of
+# static/ to static/dist/, with .gz/.br variants and resized WebP/JPEG
+# variants of the images, and a manifest.json the templates resolve names
+# through. Unless USE_BUILT_ASSETS is set, the helpers resolve names to
+# the source files, so development needs no build step.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import current_app, request, send_from_directory, url_for
+
+# Each bundle is served as one file, in this order.
+BUNDLES = {
+  'css/app.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+                  'css/main.responsive.css', 'css/main.quickfix.css'],
+  'js/head.js': ['js/libs/modernizr-2.8.2.min.js', 'js/libs/moment.min.js'],
+  'js/app.js': ['js/script.js', 'js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js'],
+}
+IMAGE_WIDTHS = (480, 960, 1440)
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.ttf', '.otf', '.eot', '.json')
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^)'"]+)\1\s*\)''')
+ONE_YEAR = 365 * 24 * 3600
+
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+def fingerprinted(name, content):
+  root, ext = os.path.splitext(name)
+  return '%s.%s%s' % (root, hashlib.sha256(content).hexdigest()[:12], ext)
+
+
+class Builder(object):
+
+  def __init__(self, static_dir, out_dir):
+    self.static_dir = os.path.abspath(static_dir)
+    self.out_dir = os.path.abspath(out_dir)
+    self.files = {}
+    self.images = {}
+
+  def write(self, name, content):
+    """Write content under its fingerprinted name, with precompressed copies."""
+    path = fingerprinted(name, content)
+    target = os.path.join(self.out_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+      f.write(content)
+    if name.endswith(COMPRESSIBLE):
+      import brotli
+      with open(target + '.gz', 'wb') as f:
+        f.write(gzip.compress(content, 9, mtime=0))
+      with open(target + '.br', 'wb') as f:
+        f.write(brotli.compress(content))
+    return path
+
+  def sources(self):
+    for directory, subdirectories, filenames in os.walk(self.static_dir):
+      subdirectories[:] = [subdirectory for subdirectory in subdirectories
+                           if os.path.join(directory, subdirectory) != self.out_dir]
+      for filename in filenames:
+        if not filename.startswith('.'):
+          yield os.path.relpath(os.path.join(directory, filename), self.static_dir).replace(os.sep, '/')
+
+  def read(self, name):
+    with open(os.path.join(self.static_dir, name), 'rb') as f:
+      return f.read()
+
+  def rewrite_urls(self, source, css, name):
+    # Stylesheets are written to dist/ and may be bundled: point every
+    # relative url() at the fingerprinted copy, or at the source file when
+    # there is none.
+    directory = os.path.dirname(name)
+    def rewrite(match):
+      url = match.group(2)
+      if re.match(r'(data:|[a-z]+:|//|/|#)', url):
+        return match.group(0)
+      path, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+      target = os.path.normpath(os.path.join(os.path.dirname(source), path)).replace(os.sep, '/')
+      if target in self.files:
+        url = os.path.relpath(self.files[target], directory)
+      else:
+        url = os.path.relpath(os.path.join('..', target), directory)
+      return 'url("%s%s")' % (url.replace(os.sep, '/'), suffix)
+    return CSS_URL.sub(rewrite, css)
+
+  def bundle(self, name, sources):
+    import rcssmin
+    import rjsmin
+    parts = []
+    for source in sources:
+      text = self.read(source).decode('utf-8')
+      if name.endswith('.css'):
+        text = self.rewrite_urls(source, text, name)
+        parts.append(text if '.min.' in source else rcssmin.cssmin(text))
+      else:
+        parts.append(text if '.min.' in source else rjsmin.jsmin(text))
+    # A newline and a semicolon keep a script without either from running into the next.
+    separator = '\n' if name.endswith('.css') else ';\n'
+    self.files[name] = self.write(name, separator.join(parts).encode('utf-8'))
+
+  def resize(self, name):
+    from PIL import Image
+    image = Image.open(os.path.join(self.static_dir, name))
+    image.load()
+    image = image.convert('RGB')
+    variants = {'image/webp': [], 'image/jpeg': []}
+    widths = [width for width in IMAGE_WIDTHS if width < image.width]
+    if image.width <= IMAGE_WIDTHS[-1]:
+      widths.append(image.width)
+    for width in widths:
+      resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+      root = os.path.splitext(name)[0]
+      for mimetype, ext, options in (('image/webp', '.webp', {'quality': 80, 'method': 6}),
+                                     ('image/jpeg', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True})):
+        buffer = io.BytesIO()
+        resized.save(buffer, format=ext[1:].replace('jpg', 'jpeg'), **options)
+        variants[mimetype].append((self.write('%s-%d%s' % (root, width, ext), buffer.getvalue()), width))
+    self.images[name] = variants
+
+  def build(self):
+    if os.path.isdir(self.out_dir):
+      shutil.rmtree(self.out_dir)
+    os.makedirs(self.out_dir)
+    bundled = set(source for sources in BUNDLES.values() for source in sources)
+    css = []
+    for name in sorted(self.sources()):
+      if name.endswith('.css'):
+        css.append(name)
+      elif name not in bundled:
+        self.files[name] = self.write(name, self.read(name))
+      if name.startswith('img/') and name.lower().endswith(('.jpg', '.jpeg', '.png')):
+        self.resize(name)
+    # Stylesheets last, so that their url()s can name the fingerprinted files.
+    for name in css:
+      if name not in bundled:
+        self.files[name] = self.write(name, self.rewrite_urls(name, self.read(name).decode('utf-8'), name).encode('utf-8'))
+    for name, sources in sorted(BUNDLES.items()):
+      self.bundle(name, sources)
+    manifest = {'files': self.files, 'images': self.images}
+    with open(os.path.join(self.out_dir, 'manifest.json'), 'w') as f:
+      json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def build(static_dir, out_dir):
+  return Builder(static_dir, out_dir).build()
+
+
+#----------------------------------------------------------------------------#
+# Templates.
+#----------------------------------------------------------------------------#
+
+class Assets(object):
+  """Resolves static file names in templates.
+
+  With USE_BUILT_ASSETS, names resolve to the fingerprinted files of the
+  build in ASSETS_DIR, served from /static/dist with far-future caching and
+  their precompressed variants; otherwise to the source files.
+  """
+
+  def __init__(self, app=None):
+    self._manifests = {}
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.add_url_rule('/static/dist/<path:filename>', 'asset', send_asset)
+    app.jinja_env.globals.update(asset_url=self.url, bundle_urls=self.bundle_urls,
+                                 srcset=self.srcset, image_url=self.image_url)
+
+  def manifest(self):
+    if not current_app.config['USE_BUILT_ASSETS']:
+      return None
+    directory = current_app.config['ASSETS_DIR']
+    if directory not in self._manifests:
+      with open(os.path.join(directory, 'manifest.json')) as f:
+        self._manifests[directory] = json.load(f)
+    return self._manifests[directory]
+
+  def url(self, name):
+    manifest = self.manifest()
+    if manifest and name in manifest['files']:
+      return url_for('asset', filename=manifest['files'][name])
+    return url_for('static', filename=name)
+
+  def bundle_urls(self, name):
+    if self.manifest():
+      return [self.url(name)]
+    return [url_for('static', filename=source) for source in BUNDLES[name]]
+
+  def variants(self, name, mimetype):
+    return (self.manifest() or {}).get('images', {}).get(name, {}).get(mimetype, [])
+
+  def srcset(self, name, mimetype):
+    """'url 480w, url 960w, ...' for the resized variants, or '' without a build."""
+    return ', '.join('%s %dw' % (url_for('asset', filename=path), width)
+                     for path, width in self.variants(name, mimetype))
+
+  def image_url(self, name, mimetype='image/jpeg'):
+    """The largest resized variant, for browsers without srcset."""
+    variants = self.variants(name, mimetype)
+    return url_for('asset', filename=variants[-1][0]) if variants else self.url(name)
+
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+def send_asset(filename):
+  # Fingerprinted names never change content, so they can be cached for good.
+  directory = current_app.config['ASSETS_DIR']
+  mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+  for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+    if request.accept_encodings[encoding] and os.path.isfile(os.path.join(directory, filename + suffix)):
+      response = send_from_directory(directory, filename + suffix, mimetype=mimetype,
+                                     cache_timeout=ONE_YEAR, conditional=True)
+      response.headers['Content-Encoding'] = encoding
+      break
+  else:
+    response = send_from_directory(directory, filename, mimetype=mimetype, cache_timeout=ONE_YEAR,
+                                   conditional=True)
+  response.vary.add('Accept-Encoding')
+  response.cache_control.immutable = True
+  return response
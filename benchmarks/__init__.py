@@ -0,0 +1,8 @@
+#----------------------------------------------------------------------------#
+# Benchmarks.
+#
+# Seed a scratch Postgres database with synthetic data and measure every
+# route of the app against it:
+#   python -m benchmarks.run --database-url postgresql://localhost/fyyur_bench \
+#     --venues 1000 --artists 1000 --shows 100000
+#----------------------------------------------------------------------------#
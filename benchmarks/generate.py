@@ -0,0 +1,76 @@
+#----------------------------------------------------------------------------#
+# Synthetic data generator.
+#----------------------------------------------------------------------------#
+
+import random
+from datetime import datetime, timedelta
+
+from forms import genre_choices
+from importer import copy_rows
+from models import db
+
+AREAS = [
+  ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('Oakland', 'CA'), ('New York', 'NY'),
+  ('Brooklyn', 'NY'), ('Austin', 'TX'), ('Houston', 'TX'), ('Chicago', 'IL'),
+  ('Seattle', 'WA'), ('Portland', 'OR'), ('Denver', 'CO'), ('Nashville', 'TN'),
+  ('New Orleans', 'LA'), ('Atlanta', 'GA'), ('Boston', 'MA'), ('Detroit', 'MI'),
+]
+ADJECTIVES = ['Blue', 'Golden', 'Velvet', 'Electric', 'Wild', 'Silent', 'Crimson', 'Lucky',
+              'Midnight', 'Rusty', 'Neon', 'Hidden', 'Broken', 'Royal', 'Little', 'Grand']
+VENUE_NOUNS = ['Hall', 'Lounge', 'Room', 'Club', 'Tavern', 'Theatre', 'Garden', 'Cellar']
+ARTIST_NOUNS = ['Band', 'Trio', 'Collective', 'Orchestra', 'Project', 'Quartet', 'Sound', 'Crew']
+GENRES = [genre for genre, label in genre_choices]
+
+
+def name(rng, nouns, i):
+  return '%s %s %s %d' % (rng.choice(ADJECTIVES), rng.choice(ADJECTIVES), rng.choice(nouns), i)
+
+
+def generate(venues, artists, shows, seed=0, future_ratio=0.1):
+  """Drop and recreate the schema, then insert the same rows for the same
+  arguments every time. Shows spread over the past ten years and the next
+  one, with about ``future_ratio`` of them upcoming, and never double-book
+  a venue or an artist."""
+  rng = random.Random(seed)
+  now = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+  db.drop_all()
+  db.create_all()
+
+  def venue_rows():
+    for i in range(venues):
+      city, state = rng.choice(AREAS)
+      yield (name(rng, VENUE_NOUNS, i), city, state, '%d Main St' % i, '555-01%02d' % (i % 100),
+             rng.sample(GENRES, 2), 'https://example.com/venues/%d.jpg' % i, False)
+
+  def artist_rows():
+    for i in range(artists):
+      city, state = rng.choice(AREAS)
+      yield (name(rng, ARTIST_NOUNS, i), city, state, '555-02%02d' % (i % 100),
+             rng.sample(GENRES, 2), 'https://example.com/artists/%d.jpg' % i, False)
+
+  def show_rows():
+    # Shows start on a four-hour grid and last three hours; a venue or artist
+    # is never given the same slot twice, so no two bookings overlap.
+    taken = set()
+    while len(taken) < 2 * shows:
+      if rng.random() < future_ratio:
+        slot = rng.randint(1, 24 * 365 // 4)
+      else:
+        slot = -rng.randint(1, 24 * 3650 // 4)
+      venue_id, artist_id = rng.randint(1, venues), rng.randint(1, artists)
+      if ('venue', venue_id, slot) in taken or ('artist', artist_id, slot) in taken:
+        continue
+      taken.update((('venue', venue_id, slot), ('artist', artist_id, slot)))
+      start_time = now + timedelta(hours=4 * slot)
+      yield (venue_id, artist_id, start_time, start_time + timedelta(hours=3))
+
+  copy_rows('Venue', ['name', 'city', 'state', 'address', 'phone', 'genres', 'image_link', 'seeking_talent'],
+            venue_rows())
+  copy_rows('Artist', ['name', 'city', 'state', 'phone', 'genres', 'image_link', 'seeking_venue'],
+            artist_rows())
+  copy_rows('Show', ['venue_id', 'artist_id', 'start_time', 'end_time'], show_rows())
+  db.session.commit()
+  # Vacuum rather than just analyze: it also flushes the GIN pending lists.
+  with db.engine.connect() as connection:
+    connection.execution_options(isolation_level='AUTOCOMMIT').execute('VACUUM ANALYZE')
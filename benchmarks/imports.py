@@ -0,0 +1,87 @@
+#----------------------------------------------------------------------------#
+# Startup benchmarks.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What each kind of process does before it can serve its first request.
+SCENARIOS = [
+  ('web worker', 'from app import create_app; create_app(migrations=False)'),
+  ('cli', 'from app import create_app; create_app()'),
+  ('wsgi preload', 'import wsgi'),
+]
+
+PROBE = '''
+import resource, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print('%f %d %d' % (elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(sys.modules)))
+'''
+
+
+def parse_importtime(stderr):
+  """Microseconds spent importing each top-level package, from -X importtime."""
+  packages = {}
+  for line in stderr.splitlines():
+    if not line.startswith('import time:') or 'cumulative' in line:
+      continue
+    self_us, cumulative_us, name = line[len('import time:'):].split('|')
+    package = name.strip().split('.')[0]
+    packages[package] = packages.get(package, 0) + int(self_us)
+  return packages
+
+
+def measure(code, runs):
+  """Run the code in ``runs`` fresh interpreters; the last run is traced."""
+  env = dict(os.environ, SECRET_KEY=os.environ.get('SECRET_KEY', 'benchmark'))
+  samples = []
+  for i in range(runs):
+    command = [sys.executable, '-X', 'importtime', '-c', PROBE.format(code=code)] if i == runs - 1 \
+      else [sys.executable, '-c', PROBE.format(code=code)]
+    process = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if process.returncode:
+      raise RuntimeError(process.stderr)
+    elapsed, max_rss_kb, modules = process.stdout.split()
+    samples.append((float(elapsed), int(max_rss_kb), int(modules)))
+  return {
+    'startup_ms': statistics.median(sample[0] for sample in samples) * 1000,
+    'max_rss_mb': statistics.median(sample[1] for sample in samples) / 1024.0,
+    'modules': samples[-1][2],
+    'slowest_packages': sorted(parse_importtime(process.stderr).items(), key=lambda item: -item[1]),
+  }
+
+
+def report(results, top):
+  print('%-14s %12s %12s %9s' % ('process', 'startup ms', 'max RSS MiB', 'modules'))
+  for name, result in results:
+    print('%-14s %12.1f %12.1f %9d' % (name, result['startup_ms'], result['max_rss_mb'], result['modules']))
+  for name, result in results:
+    print('\nslowest packages to import, %s:' % name)
+    for package, import_us in result['slowest_packages'][:top]:
+      print('  %-30s %8.1f ms' % (package, import_us / 1000.0))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time the imports and app setup of each kind of process.')
+  parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per process kind')
+  parser.add_argument('--top', type=int, default=8, help='slowest packages listed per process kind')
+  parser.add_argument('--json', help='also write the results to this file')
+  args = parser.parse_args()
+
+  results = [(name, measure(code, args.runs)) for name, code in SCENARIOS]
+  report(results, args.top)
+  if args.json:
+    with open(args.json, 'w') as f:
+      json.dump(dict(results), f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
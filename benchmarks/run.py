@@ -0,0 +1,164 @@
+#----------------------------------------------------------------------------#
+# Route benchmarks.
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+from urllib.parse import quote_plus
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import create_app
+from extensions import page_cache
+from models import db
+from benchmarks.generate import generate, AREAS, GENRES
+
+app = create_app(migrations=False)
+
+
+def routes(rng, venues, artists):
+  """Every route of the app as (name, method, url or url factory, form data).
+
+  Ids are drawn per request so detail pages are not all the same row.
+  """
+  venue = lambda: rng.randint(1, venues)
+  artist = lambda: rng.randint(1, artists)
+  start_time = lambda: (datetime.now() + timedelta(days=rng.randint(1, 365))).strftime('%Y-%m-%d %H:%M:%S')
+  venue_form = lambda: {
+    'name': 'Benchmark Venue %d' % rng.randint(0, 10 ** 9), 'city': 'Austin', 'state': 'TX',
+    'address': '1 Bench St', 'genres': 'Jazz', 'facebook_link': 'https://www.facebook.com/bench'}
+  artist_form = lambda: {
+    'name': 'Benchmark Artist %d' % rng.randint(0, 10 ** 9), 'city': 'Austin', 'state': 'TX',
+    'genres': 'Jazz', 'facebook_link': 'https://www.facebook.com/bench'}
+  return [
+    ('index', 'GET', lambda: '/', None),
+    ('venues', 'GET', lambda: '/venues', None),
+    ('venues_in_area', 'GET', lambda: '/venues?city=%s&state=%s' % tuple(map(quote_plus, rng.choice(AREAS))), None),
+    ('venues_by_genre', 'GET', lambda: '/venues?genre=' + quote_plus(rng.choice(GENRES)), None),
+    ('venue_genres', 'GET', lambda: '/venues/genres', None),
+    ('show_venue', 'GET', lambda: '/venues/%d' % venue(), None),
+    ('search_venues', 'POST', lambda: '/venues/search', lambda: {'search_term': rng.choice(['blue', 'hall', 'austin', 'velvet room'])}),
+    ('venue_typeahead', 'GET', lambda: '/venues/typeahead?q=' + rng.choice(['bl', 'gol', 'hall 1']), None),
+    ('create_venue_form', 'GET', lambda: '/venues/create', None),
+    ('edit_venue', 'GET', lambda: '/venues/%d/edit' % venue(), None),
+    ('venue_calendar', 'GET', lambda: '/venues/%d/calendar' % venue(), None),
+    ('artists', 'GET', lambda: '/artists', None),
+    ('artists_by_genre', 'GET', lambda: '/artists?genre=' + quote_plus(rng.choice(GENRES)), None),
+    ('show_artist', 'GET', lambda: '/artists/%d' % artist(), None),
+    ('search_artists', 'POST', lambda: '/artists/search', lambda: {'search_term': rng.choice(['wild', 'band', 'crimson trio'])}),
+    ('artist_typeahead', 'GET', lambda: '/artists/typeahead?q=' + rng.choice(['wi', 'neo', 'band 2']), None),
+    ('create_artist_form', 'GET', lambda: '/artists/create', None),
+    ('edit_artist', 'GET', lambda: '/artists/%d/edit' % artist(), None),
+    ('artist_calendar', 'GET', lambda: '/artists/%d/calendar?from=2019-01-01&to=2020-01-01' % artist(), None),
+    ('shows', 'GET', lambda: '/shows', None),
+    ('shows_upcoming', 'GET', lambda: '/shows?when=upcoming', None),
+    ('shows_past', 'GET', lambda: '/shows?when=past', None),
+    ('shows_by_venue', 'GET', lambda: '/shows?venue_id=%d' % venue(), None),
+    ('create_shows', 'GET', lambda: '/shows/create', None),
+    ('create_venue_submission', 'POST', lambda: '/venues/create', venue_form),
+    ('edit_venue_submission', 'POST', lambda: '/venues/%d/edit' % venue(), venue_form),
+    ('create_artist_submission', 'POST', lambda: '/artists/create', artist_form),
+    ('edit_artist_submission', 'POST', lambda: '/artists/%d/edit' % artist(), artist_form),
+    ('create_show_submission', 'POST', lambda: '/shows/create',
+     lambda: {'venue_id': venue(), 'artist_id': artist(), 'start_time': start_time()}),
+  ]
+
+
+def percentile(samples, p):
+  ordered = sorted(samples)
+  index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+  return ordered[index]
+
+
+def measure(client, method, url, data, use_cache):
+  if not use_cache:
+    page_cache.clear()
+  start = time.perf_counter()
+  response = client.open(url(), method=method, data=data() if data else None)
+  elapsed = time.perf_counter() - start
+  if response.status_code >= 500:
+    raise RuntimeError('%s %s returned %d' % (method, response.request.path, response.status_code))
+  return elapsed
+
+
+def benchmark(requests, seed=0, venues=1, artists=1, use_cache=False):
+  rng = random.Random(seed)
+  client = app.test_client()
+  statements = []
+  count = lambda *args: statements.append(1)
+  results = []
+
+  event.listen(db.engine, 'before_cursor_execute', count)
+  try:
+    for name, method, url, data in routes(rng, venues, artists):
+      measure(client, method, url, data, use_cache)  # warm up
+
+      del statements[:]
+      samples = [measure(client, method, url, data, use_cache) for i in range(requests)]
+      queries = len(statements) / float(requests)
+
+      tracemalloc.start()
+      measure(client, method, url, data, use_cache)
+      current, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+
+      results.append({
+        'route': name,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'queries': queries,
+        'peak_kb': peak / 1024.0,
+      })
+  finally:
+    event.remove(db.engine, 'before_cursor_execute', count)
+  return results
+
+
+def report(results):
+  print('%-26s %10s %10s %10s %9s %10s' % ('route', 'p50 ms', 'p95 ms', 'p99 ms', 'queries', 'peak KiB'))
+  for row in results:
+    print('%-26s %10.2f %10.2f %10.2f %9.1f %10.1f' % (
+      row['route'], row['p50_ms'], row['p95_ms'], row['p99_ms'], row['queries'], row['peak_kb']))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Seed a scratch database and benchmark every route.')
+  parser.add_argument('--database-url', default=os.environ.get('BENCHMARK_DATABASE_URL'),
+                      help='scratch Postgres database; its tables are dropped and recreated')
+  parser.add_argument('--venues', type=int, default=1000)
+  parser.add_argument('--artists', type=int, default=1000)
+  parser.add_argument('--shows', type=int, default=1000)
+  parser.add_argument('--requests', type=int, default=50, help='timed requests per route')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--cache', action='store_true', help='keep the page cache warm between requests')
+  parser.add_argument('--skip-seed', action='store_true', help='reuse the data already in the database')
+  parser.add_argument('--json', help='also write the results to this file')
+  args = parser.parse_args()
+  if not args.database_url:
+    parser.error('--database-url or BENCHMARK_DATABASE_URL is required')
+
+  app.config['SQLALCHEMY_DATABASE_URI'] = args.database_url
+  app.config['WTF_CSRF_ENABLED'] = False
+  with app.app_context():
+    if not args.skip_seed:
+      start = time.perf_counter()
+      generate(args.venues, args.artists, args.shows, seed=args.seed)
+      print('seeded %d venues, %d artists, %d shows in %.1fs' % (
+        args.venues, args.artists, args.shows, time.perf_counter() - start))
+    results = benchmark(args.requests, seed=args.seed, venues=args.venues,
+                        artists=args.artists, use_cache=args.cache)
+  report(results)
+  if args.json:
+    with open(args.json, 'w') as f:
+      json.dump({'venues': args.venues, 'artists': args.artists, 'shows': args.shows,
+                 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
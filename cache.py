@@ -0,0 +1,187 @@
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+
+from flask import g, request, session, make_response
+
+# Set by conditional(), and kept with the page so that hits can answer 304s.
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control')
+
+class LocalCache(object):
+  """Thread-safe in-process LRU. Tag versions are kept apart from the pages
+  so that evicting a page never resets a version. Entries expire after the
+  timeout they were set with, like Redis keys, so pages that change with
+  the clock are rebuilt without a write."""
+
+  def __init__(self, max_entries=1024):
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+    self._versions = {}
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      value, expires = entry
+      if expires is not None and expires <= time.monotonic():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def set(self, key, value, timeout=None):
+    with self._lock:
+      self._entries[key] = (value, time.monotonic() + timeout if timeout else None)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def versions(self, tags):
+    with self._lock:
+      return [self._versions.get(tag, 0) for tag in tags]
+
+  def bump(self, tags):
+    with self._lock:
+      for tag in tags:
+        self._versions[tag] = self._versions.get(tag, 0) + 1
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._versions.clear()
+
+
+class RedisCache(object):
+  """Cache shared by every worker, stored in Redis (requires the redis package)."""
+
+  def __init__(self, url, prefix='fyyur:'):
+    import redis
+    self._client = redis.Redis.from_url(url)
+    self._prefix = prefix
+
+  def get(self, key):
+    value = self._client.get(self._prefix + 'page:' + key)
+    return pickle.loads(value) if value is not None else None
+
+  def set(self, key, value, timeout=None):
+    self._client.set(self._prefix + 'page:' + key, pickle.dumps(value), ex=timeout)
+
+  def versions(self, tags):
+    if not tags:
+      return []
+    values = self._client.mget([self._prefix + 'tag:' + tag for tag in tags])
+    return [int(value) if value is not None else 0 for value in values]
+
+  def bump(self, tags):
+    pipeline = self._client.pipeline()
+    for tag in tags:
+      pipeline.incr(self._prefix + 'tag:' + tag)
+    pipeline.execute()
+
+  def clear(self):
+    for key in self._client.scan_iter(self._prefix + '*'):
+      self._client.delete(key)
+
+
+class PageCache(object):
+  """Caches rendered GET responses, tagged by the entities they show.
+
+  A page is stored with the version of each of its tags; invalidating a tag
+  bumps its version, so every page carrying it misses on the next read.
+  Tags are fixed per route (``'list:venues'``), may use the view arguments
+  (``'venue:{venue_id}'``) and can be added while rendering with tag().
+  ``venue:42`` covers a venue's own fields and ``venue:42:shows`` its
+  schedule, so a new show does not flush every page naming its artist.
+  """
+
+  def __init__(self, app=None):
+    self.backend = None
+    self.timeout = None
+    self.hits = Counter()
+    self.misses = Counter()
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    if app.config['PAGE_CACHE_BACKEND'] == 'redis':
+      self.backend = RedisCache(app.config['PAGE_CACHE_URL'])
+    else:
+      self.backend = LocalCache(app.config['PAGE_CACHE_MAX_ENTRIES'])
+    self.timeout = app.config['PAGE_CACHE_TIMEOUT']
+
+  def cached(self, *tags):
+    def decorator(view):
+      @wraps(view)
+      def wrapper(**kwargs):
+        # Flashed messages are rendered into the page, so never share those.
+        if request.method != 'GET' or '_flashes' in session:
+          return view(**kwargs)
+
+        # Under conditional(), the page's ETag is part of the key, so the
+        # validators that follow the clock also expire cached copies.
+        key = request.full_path + ':' + g.get('page_etag', '')
+        entry = self.backend.get(key)
+        if entry is not None:
+          entry_tags, entry_versions, data, mimetype, headers = entry
+          if self.backend.versions(entry_tags) == entry_versions:
+            self.hits[request.endpoint] += 1
+            response = make_response(data)
+            response.mimetype = mimetype
+            response.headers.extend(headers)
+            response.headers['X-Cache'] = 'HIT'
+            return response.make_conditional(request)
+
+        self.misses[request.endpoint] += 1
+        g.cache_tags = [tag.format(**kwargs) for tag in tags]
+        versions = self.backend.versions(g.cache_tags)
+        response = make_response(view(**kwargs))
+        if response.status_code == 200:
+          page_tags = g.cache_tags
+          versions += self.backend.versions(page_tags[len(versions):])
+          headers = [(name, value) for name, value in response.headers if name in VALIDATOR_HEADERS]
+          self.backend.set(key, (page_tags, versions, response.get_data(), response.mimetype, headers),
+                           timeout=self.timeout)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+      return wrapper
+    return decorator
+
+  def value(self, key, tags, load):
+    """Memoizes load() under the same tags as pages, for data several pages
+    share. The versions are read first, so a write during load() is not
+    hidden by a stale value."""
+    key = 'value:' + key
+    versions = self.backend.versions(tags)
+    entry = self.backend.get(key)
+    if entry is not None and entry[0] == versions:
+      return entry[1]
+    value = load()
+    self.backend.set(key, (versions, value), timeout=self.timeout)
+    return value
+
+  def tag(self, *tags):
+    if 'cache_tags' not in g:
+      return
+    for tag in tags:
+      if tag not in g.cache_tags:
+        g.cache_tags.append(tag)
+
+  def invalidate(self, *tags):
+    self.backend.bump(tags)
+
+  def clear(self):
+    self.backend.clear()
+    self.hits.clear()
+    self.misses.clear()
+
+  def stats(self):
+    return {endpoint: {'hits': self.hits[endpoint], 'misses': self.misses[endpoint]}
+            for endpoint in set(self.hits) | set(self.misses)}
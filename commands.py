@@ -0,0 +1,127 @@
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from extensions import page_cache
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']),
+              help='Defaults to csv for .csv files and ndjson otherwise.')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--strict', is_flag=True, help='Import nothing if any row is invalid.')
+@with_appcontext
+def import_command(kind, path, format, batch_size, strict):
+  """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+  from importer import import_file, ImportAborted
+  start = time.perf_counter()
+  try:
+    imported, errors = import_file(kind, path, format=format, batch_size=batch_size, strict=strict)
+  except ImportAborted as e:
+    for number, row_errors in e.errors[:50]:
+      click.echo('line %d: %s' % (number, row_errors), err=True)
+    raise click.ClickException(str(e))
+  elapsed = time.perf_counter() - start
+  for number, row_errors in errors[:50]:
+    click.echo('line %d: %s' % (number, row_errors), err=True)
+  # A bulk load touches too many pages to invalidate tag by tag.
+  page_cache.clear()
+  click.echo('Imported %d %s in %.2fs (%d rows/s), skipped %d invalid rows.' % (
+    imported, kind, elapsed, imported / elapsed if elapsed else 0, len(errors)))
+
+@click.command('export')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Defaults to stdout.')
+@with_appcontext
+def export_command(kind, format, output):
+  """Stream every venue, artist or show to a CSV or NDJSON file."""
+  from exporter import export_lines
+  for chunk in export_lines(kind, format):
+    output.write(chunk)
+
+@click.command('remove')
+@click.argument('kind', type=click.Choice(['venues', 'artists']))
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--ids-file', type=click.File('r'), help='More ids, one per line.')
+@click.option('--archive', type=click.File('w'), help='Write the removed rows and their shows to this NDJSON file.')
+@with_appcontext
+def remove_command(kind, ids, ids_file, archive):
+  """Delete venues or artists, with their shows, in one transaction."""
+  from removal import remove
+  ids = list(ids) + ([int(line) for line in ids_file if line.strip()] if ids_file else [])
+  start = time.perf_counter()
+  removed = remove(kind, ids, archive=archive)
+  click.echo('Removed %d %s in %.2fs; %d ids were not found.' % (
+    len(removed), kind, time.perf_counter() - start, len(set(ids)) - len(removed)))
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+  """Bundle, minify, fingerprint and precompress static/ into ASSETS_DIR."""
+  from flask import current_app
+  from assets import build
+  start = time.perf_counter()
+  manifest = build(current_app.static_folder, current_app.config['ASSETS_DIR'])
+  click.echo('Built %d files and %d images in %.2fs.' % (
+    len(manifest['files']), len(manifest['images']), time.perf_counter() - start))
+
+@click.command('recount-areas')
+@with_appcontext
+def recount_areas_command():
+  """Recount the venues and upcoming shows of every area.
+
+  Writes keep the counts current, but shows that have started since are
+  only dropped by a recount, so run this periodically (e.g. hourly).
+  """
+  from models import db, recount_areas
+  recount_areas()
+  db.session.commit()
+  page_cache.invalidate('list:venues')
+
+@click.command('rebuild-show-cards')
+@with_appcontext
+def rebuild_show_cards_command():
+  """Repopulate the show cards that the show listings read.
+
+  Writes keep them current; rebuild after loading data with the triggers
+  disabled, or to repair them.
+  """
+  from models import db, rebuild_show_cards
+  start = time.perf_counter()
+  rebuild_show_cards()
+  db.session.commit()
+  # Every listing of a show reads its card.
+  page_cache.clear()
+  click.echo('Rebuilt the show cards in %.2fs.' % (time.perf_counter() - start))
+
+@click.command('maintain-show-partitions')
+@click.option('--months-ahead', type=int, help='Defaults to SHOW_PARTITION_MONTHS_AHEAD.')
+@click.option('--archive-after', type=int, help='Months; defaults to SHOW_ARCHIVE_AFTER_MONTHS.')
+@click.option('--tablespace', help='Defaults to SHOW_ARCHIVE_TABLESPACE; nothing is archived without one.')
+@with_appcontext
+def maintain_show_partitions_command(months_ahead, archive_after, tablespace):
+  """Create the coming months' show partitions and archive old ones.
+
+  Shows of months without a partition land in the default one, so run this
+  periodically (e.g. daily).
+  """
+  from flask import current_app
+  from models import db
+  from partitions import maintain_show_partitions
+  config = current_app.config
+  created, archived = maintain_show_partitions(
+    config['SHOW_PARTITION_MONTHS_AHEAD'] if months_ahead is None else months_ahead,
+    config['SHOW_ARCHIVE_AFTER_MONTHS'] if archive_after is None else archive_after,
+    tablespace or config['SHOW_ARCHIVE_TABLESPACE'])
+  db.session.commit()
+  click.echo('Created %d partitions%s, archived %d%s.' % (
+    len(created), ' (%s)' % ', '.join(created) if created else '',
+    len(archived), ' (%s)' % ', '.join(archived) if archived else ''))
@@ -0,0 +1,105 @@
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
+
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, request, session, make_response
+from werkzeug.http import is_resource_modified
+
+from models import db, Show, TableVersion
+
+# A page also changes with the code that renders it. Unless RELEASE names the
+# deployed code, each process start counts as a new release.
+STARTED = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def latest(*times):
+  """The latest of naive local and aware datetimes, in UTC whole seconds."""
+  times = [time if time.tzinfo else time.astimezone() for time in times if time is not None]
+  return max(times).astimezone(timezone.utc).replace(microsecond=0)
+
+
+def conditional(validator):
+  """Answers If-None-Match and If-Modified-Since with 304 before the view runs.
+
+  validator(**view_args) returns (parts, last_modified) from one cheap
+  query, or None to leave the request to the view, e.g. for a missing
+  entity. The parts are hashed into a weak ETag. Pages carrying flashed
+  messages are never validated, as for the page cache. Put it above
+  page_cache.cached(), so that cached pages are validated too.
+  """
+  def decorator(view):
+    @wraps(view)
+    def wrapper(**kwargs):
+      if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+        return view(**kwargs)
+      validated = validator(**kwargs)
+      if validated is None:
+        return view(**kwargs)
+      parts, last_modified = validated
+      release = current_app.config['RELEASE'] or STARTED.isoformat()
+      etag = hashlib.sha1(repr((release, parts)).encode('utf-8')).hexdigest()[:20]
+      last_modified = latest(last_modified, STARTED)
+      # Goes outside page_cache.cached(), which keys the page by it: a page
+      # whose validator moved with the clock is rendered again.
+      g.page_etag = etag
+
+      if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response(view(**kwargs))
+        if response.status_code != 200:
+          return response
+      else:
+        response = current_app.response_class(status=304)
+      response.set_etag(etag, weak=True)
+      response.last_modified = last_modified
+      # Stored copies must be revalidated before each use.
+      response.cache_control.no_cache = True
+      return response
+    return wrapper
+  return decorator
+
+
+def table_versions(*tables, shows_at=None):
+  """Validator of a list page: the versions of the tables it reads.
+
+  Lists that split shows at ``shows_at`` (usually now) also change when the
+  next show starts, so its start time is part of the ETag and the last
+  start before it counts as a modification.
+  """
+  query = db.session.query(TableVersion.name, TableVersion.version, TableVersion.updated_at) \
+    .filter(TableVersion.name.in_(tables))
+  if shows_at is not None:
+    query = query.add_columns(
+      db.session.query(db.func.max(Show.start_time)).filter(Show.start_time<=shows_at).as_scalar(),
+      db.session.query(db.func.min(Show.start_time)).filter(Show.start_time>shows_at).as_scalar())
+  rows = query.order_by(TableVersion.name).all()
+  parts = [(row[0], row[1]) for row in rows]
+  times = [row[2] for row in rows] + [STARTED]
+  if shows_at is not None and rows:
+    parts.append(rows[0][4])
+    times.append(rows[0][3])
+  return parts, latest(*times)
+
+
+def booking_versions(model, column, other, other_column, entity_id):
+  """Validator of a venue or artist page, from its shows joined to the
+  artists or venues they list: its own row version, which a write to one of
+  its shows bumps, the sum of the others' versions and, as for the lists,
+  the show times around now. None for an unknown id."""
+  now = datetime.now()
+  row = db.session.query(
+      model.version, model.updated_at, db.func.sum(other.version), db.func.max(other.updated_at),
+      db.func.max(Show.start_time).filter(Show.start_time<=now),
+      db.func.min(Show.start_time).filter(Show.start_time>now)) \
+    .outerjoin(Show, column==model.id) \
+    .outerjoin(other, other.id==other_column) \
+    .filter(model.id==entity_id) \
+    .group_by(model.id) \
+    .first()
+  if row is None:
+    return None
+  version, updated_at, other_versions, others_updated_at, last_start, next_start = row
+  return (version, other_versions, next_start), latest(updated_at, others_updated_at, last_start)
@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------------#
+# Date formatting.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+NAMED_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+
+# babel and dateutil are imported on first use, so processes that never
+# render a date (CLI commands, the importer) do not load them.
+
+@lru_cache(maxsize=None)
+def compiled_pattern(format, zoned):
+  from babel.dates import parse_pattern
+  pattern = NAMED_FORMATS.get(format, format)
+  if zoned and format in NAMED_FORMATS:
+    pattern += ' z'
+  return parse_pattern(pattern)
+
+
+@lru_cache(maxsize=None)
+def locale_for(locale):
+  from babel import Locale
+  return Locale.parse(locale)
+
+
+@lru_cache(maxsize=None)
+def timezone_for(name):
+  return ZoneInfo(name) if name else None
+
+
+def is_timezone(name):
+  try:
+    timezone_for(name)
+  except (KeyError, ValueError):
+    return False
+  return True
+
+
+def to_datetime(value):
+  if isinstance(value, datetime):
+    return value
+  try:
+    return datetime.fromisoformat(value)
+  except ValueError:
+    import dateutil.parser
+    return dateutil.parser.parse(value)
+
+
+def format_datetime(value, format='medium', timezone=None, locale='en_US'):
+  """Format a show time with a babel pattern compiled once per format.
+
+  Show times are stored as the venue's local wall-clock time; ``timezone``
+  (an IANA name, usually the venue's) is attached rather than converted to,
+  and named formats then end with the zone abbreviation.
+  """
+  return format_datetimes([value], format, [timezone], locale)[0]
+
+
+def format_datetimes(values, format='medium', timezones=None, locale='en_US'):
+  """Format a list of show times in one call; ``timezones`` pairs up with
+  ``values`` when given."""
+  if timezones is None:
+    timezones = [None] * len(values)
+  return [formatted(to_datetime(value), format, timezone, locale) if value is not None else ''
+          for value, timezone in zip(values, timezones)]
+
+
+@lru_cache(maxsize=4096)
+def formatted(value, format, timezone, locale):
+  # Listings repeat the same evening slots, so finished strings are cached too.
+  tzinfo = timezone_for(timezone)
+  if tzinfo is not None and value.tzinfo is None:
+    value = value.replace(tzinfo=tzinfo)
+  return compiled_pattern(format, tzinfo is not None).apply(value, locale_for(locale))
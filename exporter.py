@@ -0,0 +1,74 @@
+#----------------------------------------------------------------------------#
+# Streaming export.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def export_query(kind):
+  if kind == 'shows':
+    return db.session.query(
+        Show.id, Show.start_time, Show.end_time,
+        Show.venue_id, Venue.name.label('venue_name'),
+        Show.artist_id, Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')) \
+      .join(Venue, Venue.id==Show.venue_id) \
+      .join(Artist, Artist.id==Show.artist_id) \
+      .order_by(Show.start_time, Show.id)
+  model = {'venues': Venue, 'artists': Artist}[kind]
+  columns = [column for column in model.__table__.columns]
+  return db.session.query(*columns).order_by(model.id)
+
+
+def to_text(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  if isinstance(value, list):
+    # Same separator the importer splits genres on.
+    return ';'.join(value)
+  return value
+
+
+def to_json(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  return value
+
+
+def export_lines(kind, format, batch_size=1000):
+  """Yield the export of a table as text chunks of ``batch_size`` rows.
+
+  Rows are read through a server-side cursor, so memory use does not grow
+  with the table. The CSV header is yielded before the query runs.
+  """
+  query = export_query(kind)
+  columns = [column['name'] for column in query.column_descriptions]
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  if format == 'csv':
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+  rows = 0
+  for row in query.yield_per(batch_size):
+    if format == 'csv':
+      writer.writerow([to_text(value) for value in row])
+    else:
+      buffer.write(json.dumps(dict(zip(columns, (to_json(value) for value in row)))))
+      buffer.write('\n')
+    rows += 1
+    if rows % batch_size == 0:
+      yield buffer.getvalue()
+      buffer.seek(0)
+      buffer.truncate()
+  if buffer.tell():
+    yield buffer.getvalue()
@@ -0,0 +1,13 @@
+#----------------------------------------------------------------------------#
+# Extensions, bound to the app by create_app().
+#----------------------------------------------------------------------------#
+
+from assets import Assets
+from cache import PageCache
+from profiling import QueryProfiler
+from routing import ReplicaRouter
+
+page_cache = PageCache()
+query_profiler = QueryProfiler()
+replica_router = ReplicaRouter()
+static_assets = Assets()
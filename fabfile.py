@@ -1,3 +1,6 @@
+import os
+import pipes
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
@@ -7,12 +10,22 @@ from fabric.contrib.console import confirm
 def test():
     with settings(warn_only=True):
         result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
+            "python test_queries.py -v && python test_query_plans.py -v && python test_importer.py -v && python test_routing.py -v && "
+            "python test_assets.py -v",
+            capture=True
         )
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
 
+def bench(shows=1000, database_url=None):
+    # The benchmark drops and reseeds the tables of this database.
+    database_url = database_url or os.environ.get('BENCHMARK_DATABASE_URL')
+    if not database_url:
+        abort("Pass database_url (fab bench:database_url=postgresql://...) or set BENCHMARK_DATABASE_URL.")
+    local("python -m benchmarks.run --database-url {} --shows {}".format(pipes.quote(database_url), shows))
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -40,7 +53,8 @@ def heroku():
 
 def heroku_test():
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python test_queries.py -v && heroku run python test_query_plans.py -v && "
+        "heroku run python test_importer.py -v"
     )
 
 
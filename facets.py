@@ -0,0 +1,48 @@
+#----------------------------------------------------------------------------#
+# Genre facets.
+#----------------------------------------------------------------------------#
+
+from collections import Counter
+
+from extensions import page_cache
+from models import db, Venue, Artist
+
+
+def genre_filter(model, genres):
+  # Array containment, answered by the GIN index on genres.
+  return model.genres.op('@>')(db.cast(genres, model.genres.type))
+
+
+class GenreFacets(object):
+  """How many venues or artists there are per genre, overall and per area.
+
+  One aggregate over the unnested genres fills every count. The result is
+  kept in the page cache under the list tag, which each write to the
+  table already invalidates, so it's only recomputed after a change.
+  """
+
+  def __init__(self, model, tag):
+    self.model = model
+    self.tag = tag
+
+  def load(self):
+    model = self.model
+    genres = db.session.query(db.func.unnest(model.genres).label('genre'), model.city, model.state).subquery()
+    rows = db.session.query(genres.c.genre, genres.c.city, genres.c.state, db.func.count()) \
+      .group_by(genres.c.genre, genres.c.city, genres.c.state) \
+      .all()
+    counts = {None: Counter()}
+    for genre, city, state, count in rows:
+      counts[None][genre] += count
+      counts.setdefault((city, state), Counter())[genre] += count
+    return dict((area, sorted(area_counts.items(), key=lambda item: (-item[1], item[0])))
+                for area, area_counts in counts.items())
+
+  def counts(self, city=None, state=None):
+    """[(genre, count)], most common first, for one area or everywhere."""
+    counts = page_cache.value('genres:' + self.tag, [self.tag], self.load)
+    return counts.get((city, state) if city else None, [])
+
+
+venue_genres = GenreFacets(Venue, 'list:venues')
+artist_genres = GenreFacets(Artist, 'list:artists')
@@ -1,7 +1,8 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
-from wtforms import StringField, BooleanField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, BooleanField, SelectField, SelectMultipleField, DateField, DateTimeField, IntegerField
+from wtforms.validators import DataRequired, InputRequired, AnyOf, URL, Optional, NumberRange, ValidationError
+from dates import is_timezone
 
 genre_choices = [
             ('Alternative', 'Alternative'),
@@ -80,18 +81,62 @@ state_choices = [
         ]
 
 
+def timezone_name(form, field):
+    if not is_timezone(field.data):
+        raise ValidationError('Not a known time zone, use a name like America/New_York.')
+
 class ShowForm(FlaskForm):
-    artist_id = StringField(
-        'artist_id'
+    artist_id = IntegerField(
+        'artist_id', validators=[InputRequired()]
     )
-    venue_id = StringField(
-        'venue_id'
+    venue_id = IntegerField(
+        'venue_id', validators=[InputRequired()]
     )
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
         default= datetime.today()
     )
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional()]
+    )
+
+    def validate_end_time(self, field):
+        if self.start_time.data and field.data <= self.start_time.data:
+            raise ValidationError('A show must end after it starts.')
+
+class ScheduleForm(ShowForm):
+    # The first show is start_time to end_time; the others repeat it every
+    # `interval` weeks or months, until a date or for a number of shows.
+    frequency = SelectField(
+        'frequency', validators=[DataRequired()],
+        choices=[('weekly', 'Weekly'), ('monthly', 'Monthly')]
+    )
+    interval = IntegerField(
+        'interval', validators=[Optional(), NumberRange(min=1, max=52)],
+        default=1
+    )
+    until = DateField(
+        'until', validators=[Optional()]
+    )
+    count = IntegerField(
+        'count', validators=[Optional(), NumberRange(min=1)]
+    )
+
+    def validate_until(self, field):
+        if self.start_time.data and field.data < self.start_time.data.date():
+            raise ValidationError('The schedule must end after the first show.')
+
+    def validate(self):
+        # Optional() stops the chain of a blank field before its inline
+        # validator runs, so the either/or check is made here.
+        valid = super(ScheduleForm, self).validate()
+        if not self.until.errors and not self.count.errors and \
+                (self.until.data is None) == (self.count.data is None):
+            self.until.errors.append('Give either an end date or a number of shows.')
+            return False
+        return valid
 
 class VenueForm(FlaskForm):
     name = StringField(
@@ -129,6 +174,9 @@ class VenueForm(FlaskForm):
     facebook_link = StringField(
         'facebook_link', validators=[URL()]
     )
+    timezone = StringField(
+        'timezone', validators=[Optional(), timezone_name]
+    )
 
 class ArtistForm(FlaskForm):
     name = StringField(
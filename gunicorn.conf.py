@@ -0,0 +1,17 @@
+# Gunicorn settings for the production profile, read from the working
+# directory by `gunicorn wsgi:app`.
+import multiprocessing
+import os
+
+bind = '0.0.0.0:%s' % os.environ.get('PORT', 5000)
+
+# Import the app once in the master, then fork: workers share its memory
+# and start without repeating the imports.
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Recycle workers now and then so slow leaks cannot accumulate.
+max_requests = 1000
+max_requests_jitter = 100
+timeout = 30
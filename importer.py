@@ -0,0 +1,268 @@
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+from datetime import timedelta
+
+from flask import current_app
+from psycopg2.errors import ExclusionViolation
+from werkzeug.datastructures import MultiDict
+from wtforms import IntegerField
+from wtforms.validators import Optional
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, lock_bookings
+
+
+class ImportAborted(Exception):
+
+  def __init__(self, message, errors):
+    super(ImportAborted, self).__init__(message)
+    self.errors = errors
+
+
+VENUE_COLUMNS = ['name', 'city', 'state', 'address', 'phone', 'genres', 'website',
+                 'seeking_talent', 'seeking_description', 'image_link', 'facebook_link', 'timezone']
+ARTIST_COLUMNS = ['name', 'city', 'state', 'phone', 'genres', 'website', 'seeking_venue',
+                  'seeking_description', 'image_link', 'facebook_link']
+SHOW_COLUMNS = ['artist_id', 'venue_id', 'start_time', 'end_time']
+FALSE_VALUES = ('false', '0', 'no', 'n', 'off')
+
+
+def postgres_array(values):
+  return '{%s}' % ','.join('"%s"' % value.replace('\\', '\\\\').replace('"', '\\"') for value in values)
+
+
+def copy_rows(table, columns, rows):
+  """Stream tuples into a table with COPY on the session's connection."""
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for row in rows:
+    writer.writerow([postgres_array(value) if isinstance(value, list) else value for value in row])
+  buffer.seek(0)
+  cursor = db.session.connection().connection.cursor()
+  try:
+    cursor.copy_expert('COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)' % (table, ', '.join(columns)), buffer)
+  finally:
+    cursor.close()
+
+
+def read_rows(path, format=None):
+  """Yield (line number, MultiDict) per record of a CSV or NDJSON file.
+
+  CSV genres are separated with ';'. NDJSON genres may also be a list.
+  """
+  format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+  with open(path, newline='') as f:
+    if format == 'csv':
+      for number, record in enumerate(csv.DictReader(f), start=2):
+        yield number, to_formdata(record)
+    else:
+      for number, line in enumerate(f, start=1):
+        if line.strip():
+          yield number, to_formdata(json.loads(line))
+
+
+def to_formdata(record):
+  formdata = MultiDict()
+  for key, value in record.items():
+    if value is None or value == '':
+      continue
+    if key == 'genres' and isinstance(value, str):
+      value = [genre.strip() for genre in value.split(';') if genre.strip()]
+    if isinstance(value, list):
+      for item in value:
+        formdata.add(key, item)
+    elif isinstance(value, bool):
+      if value:
+        formdata.add(key, 'y')
+    elif key.startswith('seeking_') and key != 'seeking_description':
+      if str(value).strip().lower() not in FALSE_VALUES:
+        formdata.add(key, 'y')
+    else:
+      formdata.add(key, str(value))
+  return formdata
+
+
+class ShowRowForm(ShowForm):
+  """Import rows may name the artist and venue instead of giving their ids."""
+  artist_id = IntegerField('artist_id', validators=[Optional()])
+  venue_id = IntegerField('venue_id', validators=[Optional()])
+
+
+class RowValidator(object):
+  """Validates rows with a form's own fields and validators.
+
+  Each field's outcome is memoized per raw value, since imports repeat the
+  same cities, states, genres and references on most rows and re-running
+  WTForms validation for them dominates the cost of a load. Fields with an
+  inline validate_<field> method may depend on other fields and are always
+  validated.
+  """
+
+  def __init__(self, form_class, memo_size=10000):
+    self.form = form_class(formdata=None, meta={'csrf': False})
+    self.memo_size = memo_size
+    # Field.validate() only runs the validators it is given besides its own;
+    # Form.validate() passes the inline one the same way.
+    self.inline = dict((field.name, [getattr(form_class, 'validate_' + field.name)]) for field in self.form
+                       if hasattr(form_class, 'validate_' + field.name))
+    self.memo = dict((field.name, {}) for field in self.form if field.name not in self.inline)
+
+  def __call__(self, formdata):
+    data = {}
+    errors = {}
+    for field in self.form:
+      memo = self.memo.get(field.name, {})
+      key = tuple(formdata.getlist(field.name))
+      outcome = memo.get(key)
+      if outcome is None:
+        field.process(formdata)
+        field.validate(self.form, self.inline.get(field.name, ()))
+        outcome = (field.data, list(field.errors))
+        if field.name in self.memo and len(memo) < self.memo_size:
+          memo[key] = outcome
+      else:
+        # Keep the form current for the inline validators of later fields.
+        field.data = outcome[0]
+      data[field.name], field_errors = outcome
+      if field_errors:
+        errors[field.name] = field_errors
+    return data, errors
+
+
+def validated(form_class, rows, errors):
+  validate = RowValidator(form_class)
+  for number, formdata in rows:
+    data, row_errors = validate(formdata)
+    if row_errors:
+      errors.append((number, row_errors))
+    else:
+      yield number, formdata, data
+
+
+def batches(rows, size):
+  batch = []
+  for row in rows:
+    batch.append(row)
+    if len(batch) == size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+
+class ShowResolver(object):
+  """Resolves the artist and venue of each show, one query per table and
+  batch for the references not seen in earlier batches. Rows may reference
+  them by ``artist_id``/``venue_id`` or by ``artist_name``/``venue_name``."""
+
+  models = {'artist': Artist, 'venue': Venue}
+
+  def __init__(self):
+    self.known = dict(((kind, by), {}) for kind in self.models for by in ('id', 'name'))
+    self.show_length = timedelta(hours=current_app.config['SHOW_LENGTH_HOURS'])
+
+  def reference(self, kind, formdata, data):
+    if data[kind + '_id'] is not None:
+      return 'id', data[kind + '_id']
+    return 'name', formdata.get(kind + '_name')
+
+  def lookup(self, kind, by, values):
+    known = self.known[(kind, by)]
+    missing = [value for value in values if value not in known]
+    if not missing:
+      return
+    model = self.models[kind]
+    column = getattr(model, by)
+    values = db.bindparam('values', missing, type_=db.ARRAY(column.type))
+    for value in missing:
+      known[value] = []
+    for entity_id, value in db.session.query(model.id, column).filter(column==db.func.any(values)):
+      known[value].append(entity_id)
+
+  def __call__(self, batch, errors):
+    for kind in self.models:
+      wanted = {'id': set(), 'name': set()}
+      for number, formdata, data in batch:
+        by, value = self.reference(kind, formdata, data)
+        if value is not None:
+          wanted[by].add(value)
+      for by, values in wanted.items():
+        self.lookup(kind, by, values)
+
+    rows = []
+    for number, formdata, data in batch:
+      row_errors = {}
+      ids = {}
+      for kind in self.models:
+        by, value = self.reference(kind, formdata, data)
+        matches = self.known[(kind, by)].get(value, []) if value is not None else []
+        if len(matches) == 1:
+          ids[kind] = matches[0]
+        elif value is None:
+          row_errors[kind] = ['An %s_id or %s_name is required.' % (kind, kind)]
+        elif matches:
+          row_errors[kind] = ['%r matches %d %ss.' % (value, len(matches), kind)]
+        else:
+          row_errors[kind] = ['No %s %r.' % (kind, value)]
+      if row_errors:
+        errors.append((number, row_errors))
+      else:
+        end_time = data['end_time'] or data['start_time'] + self.show_length
+        rows.append((ids['artist'], ids['venue'], data['start_time'], end_time))
+    return rows
+
+
+def import_file(kind, path, format=None, batch_size=5000, strict=False):
+  """Validate and insert every row of a file in one transaction.
+
+  Rows are checked with the same forms the web handlers use. Invalid rows
+  are skipped and reported, unless ``strict`` is set, in which case nothing
+  is imported. Shows are held until the whole file is read, to lock their
+  venues and artists first; one that overlaps a booking, in the file or the
+  database, aborts the whole import. Returns (rows imported, [(line number, errors)]).
+  """
+  form_class, table, columns = {
+    'venues': (VenueForm, 'Venue', VENUE_COLUMNS),
+    'artists': (ArtistForm, 'Artist', ARTIST_COLUMNS),
+    'shows': (ShowRowForm, 'Show', SHOW_COLUMNS),
+  }[kind]
+  errors = []
+  imported = 0
+  resolve_shows = ShowResolver()
+  shows = []
+  try:
+    for batch in batches(validated(form_class, read_rows(path, format), errors), batch_size):
+      if kind == 'shows':
+        rows = resolve_shows(batch, errors)
+      else:
+        rows = [tuple(data[column] for column in columns) for number, formdata, data in batch]
+      if strict and errors:
+        break
+      if kind == 'shows':
+        shows.extend(rows)
+      else:
+        copy_rows(table, columns, rows)
+      imported += len(rows)
+    if strict and errors:
+      raise ImportAborted('%d invalid rows, nothing was imported' % len(errors), errors)
+    if shows:
+      # Every booking lock is taken before the first show goes in, in the
+      # order lock_bookings() gives them, so that the import cannot deadlock.
+      lock_bookings({venue_id for artist_id, venue_id, start_time, end_time in shows},
+                    {artist_id for artist_id, venue_id, start_time, end_time in shows})
+      for start in range(0, len(shows), batch_size):
+        copy_rows(table, columns, shows[start:start + batch_size])
+    db.session.commit()
+  except ExclusionViolation as e:
+    db.session.rollback()
+    raise ImportAborted('A show overlaps another booking, nothing was imported: %s'
+                        % e.diag.message_detail, errors)
+  except:
+    db.session.rollback()
+    raise
+  return imported, errors
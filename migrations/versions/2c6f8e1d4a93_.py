@@ -0,0 +1,31 @@
+"""delete shows with their venue or artist
+
+Revision ID: 2c6f8e1d4a93
+Revises: e4a7c9b2f016
+Create Date: 2026-10-18 19:12:08.417305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c6f8e1d4a93'
+down_revision = 'e4a7c9b2f016'
+branch_labels = None
+depends_on = None
+
+
+def replace_foreign_keys(**options):
+    for name, table in (('Show_artist_id_fkey', 'Artist'), ('Show_venue_id_fkey', 'Venue')):
+        column = table.lower() + '_id'
+        op.drop_constraint(name, 'Show', type_='foreignkey')
+        op.create_foreign_key(name, 'Show', table, [column], ['id'], **options)
+
+
+def upgrade():
+    replace_foreign_keys(ondelete='CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys()
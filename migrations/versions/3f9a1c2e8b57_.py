@@ -0,0 +1,36 @@
+"""add Show.end_time and exclusion constraints against double bookings
+
+Revision ID: 3f9a1c2e8b57
+Revises: 6d53ef7a763e
+Create Date: 2026-10-18 11:32:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2e8b57'
+down_revision = '6d53ef7a763e'
+branch_labels = None
+depends_on = None
+
+# Must match models.id_range() and models.show_period() so the calendar
+# queries can use the constraints' indexes. Existing shows get the default
+# length of three hours; the upgrade fails on shows that already overlap.
+EXCLUDE = ('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{0}_booking" EXCLUDE USING gist '
+           "(int4range({0}_id, {0}_id, '[]') WITH &&, tsrange(start_time, end_time) WITH &&)")
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute('UPDATE "Show" SET end_time = start_time + interval \'3 hours\'')
+    op.alter_column('Show', 'end_time', nullable=False)
+    op.execute(EXCLUDE.format('venue'))
+    op.execute(EXCLUDE.format('artist'))
+
+
+def downgrade():
+    op.drop_constraint('ex_Show_artist_booking', 'Show')
+    op.drop_constraint('ex_Show_venue_booking', 'Show')
+    op.drop_column('Show', 'end_time')
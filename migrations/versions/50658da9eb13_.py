@@ -0,0 +1,32 @@
+"""add full-text search indexes on Venue and Artist
+
+Revision ID: 50658da9eb13
+Revises: 1895f3903177
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '50658da9eb13'
+down_revision = '1895f3903177'
+branch_labels = None
+depends_on = None
+
+# Must match models.search_document() so the planner can use the index.
+SEARCH_DOCUMENT = (
+    "(setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B'))"
+)
+
+
+def upgrade():
+    op.create_index('ix_Venue_search', 'Venue', [sa.text(SEARCH_DOCUMENT)], postgresql_using='gin')
+    op.create_index('ix_Artist_search', 'Artist', [sa.text(SEARCH_DOCUMENT)], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_search', table_name='Artist')
+    op.drop_index('ix_Venue_search', table_name='Venue')
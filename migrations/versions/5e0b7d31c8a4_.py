@@ -0,0 +1,109 @@
+"""add row and table versions for conditional GETs
+
+Revision ID: 5e0b7d31c8a4
+Revises: c81b5f0e2d94
+Create Date: 2026-10-18 16:02:47.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0b7d31c8a4'
+down_revision = 'c81b5f0e2d94'
+branch_labels = None
+depends_on = None
+
+# Same as models.VERSION_TRIGGERS at this revision.
+VERSION_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+  NEW.version := OLD.version + 1;
+  NEW.updated_at := now();
+  RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+  IF pg_trigger_depth() = 1 THEN
+    INSERT INTO "TableVersion" AS table_version (name, version, updated_at) VALUES (TG_TABLE_NAME, 1, now())
+      ON CONFLICT (name) DO UPDATE SET version = table_version.version + 1, updated_at = now();
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION touch_booked() RETURNS trigger AS $$
+DECLARE
+  venue_ids integer[];
+  artist_ids integer[];
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    venue_ids := ARRAY(SELECT DISTINCT venue_id FROM old_shows);
+    artist_ids := ARRAY(SELECT DISTINCT artist_id FROM old_shows);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    venue_ids := venue_ids || ARRAY(SELECT DISTINCT venue_id FROM new_shows);
+    artist_ids := artist_ids || ARRAY(SELECT DISTINCT artist_id FROM new_shows);
+  END IF;
+  -- Rows are locked in id order, so that concurrent bookings cannot deadlock.
+  PERFORM 1 FROM "Venue" WHERE id = ANY(venue_ids) ORDER BY id FOR UPDATE;
+  UPDATE "Venue" SET updated_at = now() WHERE id = ANY(venue_ids);
+  PERFORM 1 FROM "Artist" WHERE id = ANY(artist_ids) ORDER BY id FOR UPDATE;
+  UPDATE "Artist" SET updated_at = now() WHERE id = ANY(artist_ids);
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Venue_row_version" BEFORE UPDATE ON "Venue"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Artist_row_version" BEFORE UPDATE ON "Artist"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Show_row_version" BEFORE UPDATE ON "Show"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Venue_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Venue"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Artist_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Artist"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Show_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Show"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Area_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Area"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Show_touch_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_touch_update" AFTER UPDATE ON "Show" REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_touch_delete" AFTER DELETE ON "Show" REFERENCING OLD TABLE AS old_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+'''
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('TableVersion',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    for table in ('Artist', 'Show', 'Venue'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    # ### end Alembic commands ###
+    op.execute(VERSION_TRIGGERS)
+    op.execute('INSERT INTO "TableVersion" (name, version) VALUES (\'Area\', 1), (\'Artist\', 1), (\'Show\', 1), (\'Venue\', 1)')
+
+
+def downgrade():
+    for table in ('Venue', 'Artist', 'Show'):
+        op.execute('DROP TRIGGER "%s_row_version" ON "%s"' % (table, table))
+    for table in ('Venue', 'Artist', 'Show', 'Area'):
+        op.execute('DROP TRIGGER "%s_table_version" ON "%s"' % (table, table))
+    for event in ('insert', 'update', 'delete'):
+        op.execute('DROP TRIGGER "Show_touch_%s" ON "Show"' % event)
+    op.execute('DROP FUNCTION touch_booked(), bump_table_version(), bump_row_version()')
+    # ### commands auto generated by Alembic - please adjust! ###
+    for table in ('Venue', 'Show', 'Artist'):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
+    op.drop_table('TableVersion')
+    # ### end Alembic commands ###
@@ -0,0 +1,112 @@
+"""add the ShowCard read model of the show tiles
+
+Revision ID: 9b3e6f2a7d15
+Revises: 5e0b7d31c8a4
+Create Date: 2026-10-18 17:12:40.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b3e6f2a7d15'
+down_revision = '5e0b7d31c8a4'
+branch_labels = None
+depends_on = None
+
+# Same as models.SHOW_CARD_TRIGGERS at this revision.
+SHOW_CARD_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION write_show_cards() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO "ShowCard" AS card (show_id, start_time, venue_id, venue_name, venue_image_link, venue_timezone,
+                                artist_id, artist_name, artist_image_link)
+  SELECT shows.id, shows.start_time, "Venue".id, "Venue".name, "Venue".image_link, "Venue".timezone,
+         "Artist".id, "Artist".name, "Artist".image_link
+  FROM new_shows shows
+  JOIN "Venue" ON "Venue".id = shows.venue_id
+  JOIN "Artist" ON "Artist".id = shows.artist_id
+  ON CONFLICT (show_id) DO UPDATE SET
+    start_time = EXCLUDED.start_time, venue_id = EXCLUDED.venue_id, venue_name = EXCLUDED.venue_name,
+    venue_image_link = EXCLUDED.venue_image_link, venue_timezone = EXCLUDED.venue_timezone,
+    artist_id = EXCLUDED.artist_id, artist_name = EXCLUDED.artist_name,
+    artist_image_link = EXCLUDED.artist_image_link;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rename_venue_cards() RETURNS trigger AS $$
+BEGIN
+  UPDATE "ShowCard" SET venue_name = NEW.name, venue_image_link = NEW.image_link, venue_timezone = NEW.timezone
+    WHERE venue_id = NEW.id;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rename_artist_cards() RETURNS trigger AS $$
+BEGIN
+  UPDATE "ShowCard" SET artist_name = NEW.name, artist_image_link = NEW.image_link
+    WHERE artist_id = NEW.id;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Show_card_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE write_show_cards();
+CREATE TRIGGER "Show_card_update" AFTER UPDATE ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE write_show_cards();
+CREATE TRIGGER "Venue_card_update" AFTER UPDATE ON "Venue" FOR EACH ROW
+  WHEN ((OLD.name, OLD.image_link, OLD.timezone) IS DISTINCT FROM (NEW.name, NEW.image_link, NEW.timezone))
+  EXECUTE PROCEDURE rename_venue_cards();
+CREATE TRIGGER "Artist_card_update" AFTER UPDATE ON "Artist" FOR EACH ROW
+  WHEN ((OLD.name, OLD.image_link) IS DISTINCT FROM (NEW.name, NEW.image_link))
+  EXECUTE PROCEDURE rename_artist_cards();
+'''
+
+# Same as models.rebuild_show_cards() at this revision.
+SHOW_CARDS = '''
+INSERT INTO "ShowCard" AS card (show_id, start_time, venue_id, venue_name, venue_image_link, venue_timezone,
+                                artist_id, artist_name, artist_image_link)
+  SELECT shows.id, shows.start_time, "Venue".id, "Venue".name, "Venue".image_link, "Venue".timezone,
+         "Artist".id, "Artist".name, "Artist".image_link
+  FROM "Show" shows
+  JOIN "Venue" ON "Venue".id = shows.venue_id
+  JOIN "Artist" ON "Artist".id = shows.artist_id
+  ON CONFLICT (show_id) DO UPDATE SET
+    start_time = EXCLUDED.start_time, venue_id = EXCLUDED.venue_id, venue_name = EXCLUDED.venue_name,
+    venue_image_link = EXCLUDED.venue_image_link, venue_timezone = EXCLUDED.venue_timezone,
+    artist_id = EXCLUDED.artist_id, artist_name = EXCLUDED.artist_name,
+    artist_image_link = EXCLUDED.artist_image_link
+'''
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('ShowCard',
+    sa.Column('show_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('venue_image_link', sa.String(length=500), nullable=True),
+    sa.Column('venue_timezone', sa.String(length=64), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['show_id'], ['Show.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('show_id')
+    )
+    op.create_index('ix_ShowCard_artist_id_start_time', 'ShowCard', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_ShowCard_start_time_show_id', 'ShowCard', ['start_time', 'show_id'], unique=False)
+    op.create_index('ix_ShowCard_venue_id_start_time', 'ShowCard', ['venue_id', 'start_time'], unique=False)
+    # ### end Alembic commands ###
+    op.execute(SHOW_CARD_TRIGGERS)
+    op.execute(SHOW_CARDS)
+
+
+def downgrade():
+    for table, event in (('Show', 'insert'), ('Show', 'update'), ('Venue', 'update'), ('Artist', 'update')):
+        op.execute('DROP TRIGGER "%s_card_%s" ON "%s"' % (table, event, table))
+    op.execute('DROP FUNCTION rename_artist_cards(), rename_venue_cards(), write_show_cards()')
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_ShowCard_venue_id_start_time', table_name='ShowCard')
+    op.drop_index('ix_ShowCard_start_time_show_id', table_name='ShowCard')
+    op.drop_index('ix_ShowCard_artist_id_start_time', table_name='ShowCard')
+    op.drop_table('ShowCard')
+    # ### end Alembic commands ###
@@ -0,0 +1,116 @@
+"""add the Area summary of venue and upcoming show counts per city
+
+Revision ID: c81b5f0e2d94
+Revises: a4d27e915c03
+Create Date: 2026-10-18 14:21:09.552871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81b5f0e2d94'
+down_revision = 'a4d27e915c03'
+branch_labels = None
+depends_on = None
+
+# Same as models.AREA_TRIGGERS at this revision.
+AREA_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION recount_area(area_city varchar, area_state varchar) RETURNS void AS $$
+BEGIN
+  INSERT INTO "Area" AS area (city, state, venue_count, upcoming_shows) VALUES (area_city, area_state, 0, 0)
+    ON CONFLICT (city, state) DO UPDATE SET venue_count = area.venue_count;
+  UPDATE "Area" SET
+    venue_count = (SELECT count(*) FROM "Venue" WHERE city = area_city AND state = area_state),
+    upcoming_shows = (SELECT count(*) FROM "Show" JOIN "Venue" ON "Venue".id = "Show".venue_id
+                      WHERE "Venue".city = area_city AND "Venue".state = area_state
+                        AND "Show".start_time > LOCALTIMESTAMP)
+  WHERE city = area_city AND state = area_state;
+  DELETE FROM "Area" WHERE city = area_city AND state = area_state AND venue_count = 0;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_new_venues() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO "Area" AS area (city, state, venue_count, upcoming_shows)
+    SELECT city, state, count(*), 0 FROM new_venues
+    WHERE city IS NOT NULL AND state IS NOT NULL
+    GROUP BY city, state ORDER BY city, state
+    ON CONFLICT (city, state) DO UPDATE SET venue_count = area.venue_count + EXCLUDED.venue_count;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION recount_venue_areas() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM recount_area(city, state) FROM (SELECT DISTINCT city, state FROM old_venues) areas
+      WHERE city IS NOT NULL AND state IS NOT NULL ORDER BY city, state;
+  ELSE
+    -- Only the venues that moved change any count.
+    PERFORM recount_area(city, state) FROM (
+      SELECT old_venue.city, old_venue.state FROM old_venues old_venue JOIN new_venues new_venue USING (id)
+        WHERE (old_venue.city, old_venue.state) IS DISTINCT FROM (new_venue.city, new_venue.state)
+      UNION
+      SELECT new_venue.city, new_venue.state FROM old_venues old_venue JOIN new_venues new_venue USING (id)
+        WHERE (old_venue.city, old_venue.state) IS DISTINCT FROM (new_venue.city, new_venue.state)) areas
+      WHERE city IS NOT NULL AND state IS NOT NULL ORDER BY city, state;
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_upcoming_shows() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE "Area" area SET upcoming_shows = area.upcoming_shows - shows.count FROM (
+      SELECT "Venue".city, "Venue".state, count(*) FROM old_shows JOIN "Venue" ON "Venue".id = old_shows.venue_id
+      WHERE old_shows.start_time > LOCALTIMESTAMP GROUP BY "Venue".city, "Venue".state) shows
+    WHERE area.city = shows.city AND area.state = shows.state;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    UPDATE "Area" area SET upcoming_shows = area.upcoming_shows + shows.count FROM (
+      SELECT "Venue".city, "Venue".state, count(*) FROM new_shows JOIN "Venue" ON "Venue".id = new_shows.venue_id
+      WHERE new_shows.start_time > LOCALTIMESTAMP GROUP BY "Venue".city, "Venue".state) shows
+    WHERE area.city = shows.city AND area.state = shows.state;
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Venue_area_insert" AFTER INSERT ON "Venue" REFERENCING NEW TABLE AS new_venues
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_new_venues();
+CREATE TRIGGER "Venue_area_update" AFTER UPDATE ON "Venue" REFERENCING OLD TABLE AS old_venues NEW TABLE AS new_venues
+  FOR EACH STATEMENT EXECUTE PROCEDURE recount_venue_areas();
+CREATE TRIGGER "Venue_area_delete" AFTER DELETE ON "Venue" REFERENCING OLD TABLE AS old_venues
+  FOR EACH STATEMENT EXECUTE PROCEDURE recount_venue_areas();
+CREATE TRIGGER "Show_area_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_area_update" AFTER UPDATE ON "Show" REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_area_delete" AFTER DELETE ON "Show" REFERENCING OLD TABLE AS old_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+'''
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('Area',
+    sa.Column('city', sa.String(length=120), nullable=False),
+    sa.Column('state', sa.String(length=120), nullable=False),
+    sa.Column('venue_count', sa.Integer(), nullable=False),
+    sa.Column('upcoming_shows', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('city', 'state')
+    )
+    # ### end Alembic commands ###
+    op.execute(AREA_TRIGGERS)
+    op.execute('SELECT recount_area(city, state) FROM (SELECT DISTINCT city, state FROM "Venue" '
+               'WHERE city IS NOT NULL AND state IS NOT NULL ORDER BY city, state) areas')
+
+
+def downgrade():
+    for table, event in (('Venue', 'insert'), ('Venue', 'update'), ('Venue', 'delete'),
+                         ('Show', 'insert'), ('Show', 'update'), ('Show', 'delete')):
+        op.execute('DROP TRIGGER "%s_area_%s" ON "%s"' % (table, event, table))
+    op.execute('DROP FUNCTION count_upcoming_shows(), recount_venue_areas(), count_new_venues(), '
+               'recount_area(varchar, varchar)')
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('Area')
+    # ### end Alembic commands ###
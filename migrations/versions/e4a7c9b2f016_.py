@@ -0,0 +1,163 @@
+"""partition Show by month of start_time
+
+Revision ID: e4a7c9b2f016
+Revises: 9b3e6f2a7d15
+Create Date: 2026-10-18 18:05:31.662940
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c9b2f016'
+down_revision = '9b3e6f2a7d15'
+branch_labels = None
+depends_on = None
+
+# Partitions are created from the month of the first show through
+# config.SHOW_PARTITION_MONTHS_AHEAD months from now; later shows go to the
+# default partition until `flask maintain-show-partitions` runs.
+MONTHS_AHEAD = 3
+
+CREATE_SHOW = '''
+CREATE TABLE "Show" (
+  id integer NOT NULL DEFAULT nextval('"Show_id_seq"'::regclass),
+  start_time timestamp without time zone NOT NULL,
+  end_time timestamp without time zone NOT NULL,
+  artist_id integer NOT NULL,
+  venue_id integer NOT NULL,
+  version integer NOT NULL DEFAULT 1,
+  updated_at timestamp with time zone NOT NULL DEFAULT now()
+){partition}
+'''
+
+COLUMNS = 'id, start_time, end_time, artist_id, venue_id, version, updated_at'
+
+# Dropped with the table they were on; same as in models.py at this revision.
+SHOW_TRIGGERS = '''
+CREATE TRIGGER "Show_area_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_area_update" AFTER UPDATE ON "Show" REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_area_delete" AFTER DELETE ON "Show" REFERENCING OLD TABLE AS old_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_row_version" BEFORE UPDATE ON "Show"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Show_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Show"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Show_touch_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_touch_update" AFTER UPDATE ON "Show" REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_touch_delete" AFTER DELETE ON "Show" REFERENCING OLD TABLE AS old_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_card_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE write_show_cards();
+CREATE TRIGGER "Show_card_update" AFTER UPDATE ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE write_show_cards();
+'''
+
+# Same as models.BOOKING_TRIGGERS at this revision.
+BOOKING_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION check_show_booking() RETURNS trigger AS $$
+DECLARE
+  other record;
+BEGIN
+  PERFORM pg_advisory_xact_lock(1, NEW.venue_id);
+  PERFORM pg_advisory_xact_lock(2, NEW.artist_id);
+  SELECT venue_id, start_time, end_time INTO other FROM "Show"
+    WHERE int4range(venue_id, venue_id, '[]') && int4range(NEW.venue_id, NEW.venue_id, '[]')
+      AND tsrange(start_time, end_time) && tsrange(NEW.start_time, NEW.end_time)
+      AND id <> NEW.id
+    LIMIT 1;
+  IF FOUND THEN
+    RAISE EXCEPTION 'The venue already has a show at that time'
+      USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'ex_Show_venue_booking', TABLE = 'Show',
+            DETAIL = 'Key (venue_id, tsrange(start_time, end_time))=(' || NEW.venue_id || ', '
+              || tsrange(NEW.start_time, NEW.end_time) || ') conflicts with existing key (venue_id, '
+              || 'tsrange(start_time, end_time))=(' || other.venue_id || ', '
+              || tsrange(other.start_time, other.end_time) || ').';
+  END IF;
+  SELECT artist_id, start_time, end_time INTO other FROM "Show"
+    WHERE int4range(artist_id, artist_id, '[]') && int4range(NEW.artist_id, NEW.artist_id, '[]')
+      AND tsrange(start_time, end_time) && tsrange(NEW.start_time, NEW.end_time)
+      AND id <> NEW.id
+    LIMIT 1;
+  IF FOUND THEN
+    RAISE EXCEPTION 'The artist is already booked at that time'
+      USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'ex_Show_artist_booking', TABLE = 'Show',
+            DETAIL = 'Key (artist_id, tsrange(start_time, end_time))=(' || NEW.artist_id || ', '
+              || tsrange(NEW.start_time, NEW.end_time) || ') conflicts with existing key (artist_id, '
+              || 'tsrange(start_time, end_time))=(' || other.artist_id || ', '
+              || tsrange(other.start_time, other.end_time) || ').';
+  END IF;
+  RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Show_booking" BEFORE INSERT OR UPDATE OF venue_id, artist_id, start_time, end_time ON "Show"
+  FOR EACH ROW EXECUTE PROCEDURE check_show_booking();
+'''
+
+# As in 3f9a1c2e8b57, for the downgrade.
+EXCLUDE = ('ALTER TABLE "Show" ADD CONSTRAINT "ex_Show_{0}_booking" EXCLUDE USING gist '
+           "(int4range({0}_id, {0}_id, '[]') WITH &&, tsrange(start_time, end_time) WITH &&)")
+BOOKING_INDEX = ('CREATE INDEX "ix_Show_{0}_booking" ON "Show" USING gist '
+                 "(int4range({0}_id, {0}_id, '[]'), tsrange(start_time, end_time))")
+
+
+def add_months(first, months):
+    month = first.year * 12 + first.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def replace_show(partition):
+    """Move the shows to a new "Show" table, partitioned or not, and drop the
+    old one; its keys, indexes and triggers are left to the caller."""
+    op.drop_constraint('ShowCard_show_id_fkey' if partition else 'ShowCard_show_id_start_time_fkey',
+                       'ShowCard', type_='foreignkey')
+    op.execute('ALTER TABLE "Show" RENAME TO "Show_old"')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+    op.execute(CREATE_SHOW.format(partition=' PARTITION BY RANGE (start_time)' if partition else ''))
+    if partition:
+        op.execute('CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT')
+        today = date.today()
+        first = op.get_bind().execute('SELECT min(start_time) FROM "Show_old"').scalar() or today
+        month = date(first.year, first.month, 1)
+        last = add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        while month <= last:
+            op.execute("CREATE TABLE \"Show_{0:%Y_%m}\" PARTITION OF \"Show\" "
+                       "FOR VALUES FROM ('{0}') TO ('{1}')".format(month, add_months(month, 1)))
+            month = add_months(month, 1)
+    op.execute('INSERT INTO "Show" ({0}) SELECT {0} FROM "Show_old"'.format(COLUMNS))
+    op.execute('DROP TABLE "Show_old"')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.create_foreign_key('Show_artist_id_fkey', 'Show', 'Artist', ['artist_id'], ['id'])
+    op.create_foreign_key('Show_venue_id_fkey', 'Show', 'Venue', ['venue_id'], ['id'])
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+
+
+def upgrade():
+    replace_show(partition=True)
+    op.create_primary_key('Show_pkey', 'Show', ['id', 'start_time'])
+    op.execute(BOOKING_INDEX.format('venue'))
+    op.execute(BOOKING_INDEX.format('artist'))
+    op.create_foreign_key('ShowCard_show_id_start_time_fkey', 'ShowCard', 'Show',
+                          ['show_id', 'start_time'], ['id', 'start_time'],
+                          ondelete='CASCADE', onupdate='CASCADE')
+    op.execute(SHOW_TRIGGERS)
+    op.execute(BOOKING_TRIGGERS)
+
+
+def downgrade():
+    replace_show(partition=False)
+    op.create_primary_key('Show_pkey', 'Show', ['id'])
+    op.execute(EXCLUDE.format('venue'))
+    op.execute(EXCLUDE.format('artist'))
+    op.create_foreign_key('ShowCard_show_id_fkey', 'ShowCard', 'Show', ['show_id'], ['id'], ondelete='CASCADE')
+    op.execute(SHOW_TRIGGERS)
+    op.execute('DROP FUNCTION check_show_booking()')
@@ -5,22 +5,35 @@
 #----------------------------------------------------------------------------#
 # Imports
 #----------------------------------------------------------------------------#
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import DDL, event
+
+from routing import RoutingSQLAlchemy
 
 #----------------------------------------------------------------------------#
-# App Config.
+# Database.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-app.config.from_object('config')
-db = SQLAlchemy(app)
+# Bound to the app by create_app().
+db = RoutingSQLAlchemy()
+
+def search_document(model):
+    """Weighted tsvector of a venue or artist: name ranks above city/state.
+
+    Must stay identical to the expression indexed by the search migration,
+    otherwise Postgres falls back to a sequential scan.
+    """
+    simple = db.text("'simple'")
+    location = db.func.coalesce(model.city, '') + ' ' + db.func.coalesce(model.state, '')
+    return db.func.setweight(db.func.to_tsvector(simple, db.func.coalesce(model.name, '')), 'A') \
+        .op('||')(db.func.setweight(db.func.to_tsvector(simple, location), 'B'))
 
-migrate = Migrate(app, db)
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_city_state', 'city', 'state'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -34,15 +47,35 @@ class Venue(db.Model):
     genres = db.Column(db.ARRAY(db.String))
     seeking_description = db.Column(db.String(120))
     seeking_talent = db.Column(db.Boolean)
-    shows = db.relationship('Show',cascade="all, delete", backref='Venue', lazy=True)
+    timezone = db.Column(db.String(64))
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+    # Shows are deleted by the database (ON DELETE CASCADE), not loaded first.
+    shows = db.relationship('Show', cascade="all, delete", passive_deletes=True, backref='Venue', lazy=True)
 
     def __repr__(self):
         return f'<Venue ID: {self.id}, name: {self.name}>'
 
     
 
+class Area(db.Model):
+    """Venue and upcoming show counts per city, maintained by AREA_TRIGGERS."""
+    __tablename__ = 'Area'
+
+    city = db.Column(db.String(120), primary_key=True)
+    state = db.Column(db.String(120), primary_key=True)
+    venue_count = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_shows = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<Area {self.city}, {self.state}: {self.venue_count} venues>'
+
+
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -55,15 +88,357 @@ class Artist(db.Model):
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(120))
-    shows = db.relationship('Show', backref='Artist', lazy=True)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+    shows = db.relationship('Show', cascade="all, delete", passive_deletes=True, backref='Artist', lazy=True)
 
     def __repr__(self):
         return f'<Artist ID: {self.id}, name: {self.name}>'
 
 
 class Show(db.Model):
+  """Range-partitioned by month of start_time; see create_show_partition().
+
+  A partitioned table's primary key must hold the partition key, so it is
+  (id, start_time); ids still come from one sequence and are unique.
+  """
   __tablename__ = 'Show'
-  id = db.Column(db.Integer, primary_key=True)
+  __table_args__ = (
+    db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    {'postgresql_partition_by': 'RANGE (start_time)'},
+  )
+  id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+  start_time = db.Column(db.DateTime, primary_key=True)
+  end_time = db.Column(db.DateTime, nullable=False)
+  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
+  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+  version = db.Column(db.Integer, nullable=False, server_default='1')
+  updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+
+class ShowCard(db.Model):
+  """What a show tile renders, one row per show; maintained by SHOW_CARD_TRIGGERS."""
+  __tablename__ = 'ShowCard'
+  __table_args__ = (
+    db.ForeignKeyConstraint(['show_id', 'start_time'], ['Show.id', 'Show.start_time'],
+                            ondelete='CASCADE', onupdate='CASCADE'),
+    db.Index('ix_ShowCard_venue_id_start_time', 'venue_id', 'start_time'),
+    db.Index('ix_ShowCard_artist_id_start_time', 'artist_id', 'start_time'),
+    db.Index('ix_ShowCard_start_time_show_id', 'start_time', 'show_id'),
+  )
+  show_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
   start_time = db.Column(db.DateTime, nullable=False)
-  artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-  venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
\ No newline at end of file
+  venue_id = db.Column(db.Integer, nullable=False)
+  venue_name = db.Column(db.String)
+  venue_image_link = db.Column(db.String(500))
+  venue_timezone = db.Column(db.String(64))
+  artist_id = db.Column(db.Integer, nullable=False)
+  artist_name = db.Column(db.String)
+  artist_image_link = db.Column(db.String(500))
+
+
+class TableVersion(db.Model):
+  """One row per table, counting the statements that wrote to it; see VERSION_TRIGGERS."""
+  __tablename__ = 'TableVersion'
+
+  name = db.Column(db.String(64), primary_key=True)
+  version = db.Column(db.BigInteger, nullable=False, default=1)
+  updated_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+
+def id_range(column):
+    """A venue or artist id as a one-element range, so that gist can index it
+    next to a show's period without the btree_gist extension."""
+    return db.func.int4range(column, column, db.text("'[]'"))
+
+def show_period(start_time, end_time):
+    return db.func.tsrange(start_time, end_time)
+
+# A venue cannot host, and an artist cannot play, two shows at once.
+# Partitioned tables cannot have exclusion constraints, so BOOKING_TRIGGERS
+# looks for an overlapping show through these gist indexes, which also
+# answer the calendar range queries; both must use the same expressions.
+db.Index('ix_Show_venue_booking', id_range(Show.venue_id), show_period(Show.start_time, Show.end_time),
+         postgresql_using='gist')
+db.Index('ix_Show_artist_booking', id_range(Show.artist_id), show_period(Show.start_time, Show.end_time),
+         postgresql_using='gist')
+
+db.Index('ix_Venue_search', search_document(Venue), postgresql_using='gin')
+db.Index('ix_Artist_search', search_document(Artist), postgresql_using='gin')
+
+# Keeps "Area" current from the statements that change venues and shows,
+# including COPY imports and cascaded deletes. New venues and shows are
+# added as deltas; moved or deleted venues recount their areas from scratch,
+# after locking the area row so that the count sees every transaction that
+# changed it first. Shows that start stop being upcoming without any write,
+# so `flask recount-areas` should also run periodically.
+AREA_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION recount_area(area_city varchar, area_state varchar) RETURNS void AS $$
+BEGIN
+  INSERT INTO "Area" AS area (city, state, venue_count, upcoming_shows) VALUES (area_city, area_state, 0, 0)
+    ON CONFLICT (city, state) DO UPDATE SET venue_count = area.venue_count;
+  UPDATE "Area" SET
+    venue_count = (SELECT count(*) FROM "Venue" WHERE city = area_city AND state = area_state),
+    upcoming_shows = (SELECT count(*) FROM "Show" JOIN "Venue" ON "Venue".id = "Show".venue_id
+                      WHERE "Venue".city = area_city AND "Venue".state = area_state
+                        AND "Show".start_time > LOCALTIMESTAMP)
+  WHERE city = area_city AND state = area_state;
+  DELETE FROM "Area" WHERE city = area_city AND state = area_state AND venue_count = 0;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_new_venues() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO "Area" AS area (city, state, venue_count, upcoming_shows)
+    SELECT city, state, count(*), 0 FROM new_venues
+    WHERE city IS NOT NULL AND state IS NOT NULL
+    GROUP BY city, state ORDER BY city, state
+    ON CONFLICT (city, state) DO UPDATE SET venue_count = area.venue_count + EXCLUDED.venue_count;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION recount_venue_areas() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM recount_area(city, state) FROM (SELECT DISTINCT city, state FROM old_venues) areas
+      WHERE city IS NOT NULL AND state IS NOT NULL ORDER BY city, state;
+  ELSE
+    -- Only the venues that moved change any count.
+    PERFORM recount_area(city, state) FROM (
+      SELECT old_venue.city, old_venue.state FROM old_venues old_venue JOIN new_venues new_venue USING (id)
+        WHERE (old_venue.city, old_venue.state) IS DISTINCT FROM (new_venue.city, new_venue.state)
+      UNION
+      SELECT new_venue.city, new_venue.state FROM old_venues old_venue JOIN new_venues new_venue USING (id)
+        WHERE (old_venue.city, old_venue.state) IS DISTINCT FROM (new_venue.city, new_venue.state)) areas
+      WHERE city IS NOT NULL AND state IS NOT NULL ORDER BY city, state;
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_upcoming_shows() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    UPDATE "Area" area SET upcoming_shows = area.upcoming_shows - shows.count FROM (
+      SELECT "Venue".city, "Venue".state, count(*) FROM old_shows JOIN "Venue" ON "Venue".id = old_shows.venue_id
+      WHERE old_shows.start_time > LOCALTIMESTAMP GROUP BY "Venue".city, "Venue".state) shows
+    WHERE area.city = shows.city AND area.state = shows.state;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    UPDATE "Area" area SET upcoming_shows = area.upcoming_shows + shows.count FROM (
+      SELECT "Venue".city, "Venue".state, count(*) FROM new_shows JOIN "Venue" ON "Venue".id = new_shows.venue_id
+      WHERE new_shows.start_time > LOCALTIMESTAMP GROUP BY "Venue".city, "Venue".state) shows
+    WHERE area.city = shows.city AND area.state = shows.state;
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Venue_area_insert" AFTER INSERT ON "Venue" REFERENCING NEW TABLE AS new_venues
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_new_venues();
+CREATE TRIGGER "Venue_area_update" AFTER UPDATE ON "Venue" REFERENCING OLD TABLE AS old_venues NEW TABLE AS new_venues
+  FOR EACH STATEMENT EXECUTE PROCEDURE recount_venue_areas();
+CREATE TRIGGER "Venue_area_delete" AFTER DELETE ON "Venue" REFERENCING OLD TABLE AS old_venues
+  FOR EACH STATEMENT EXECUTE PROCEDURE recount_venue_areas();
+CREATE TRIGGER "Show_area_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_area_update" AFTER UPDATE ON "Show" REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+CREATE TRIGGER "Show_area_delete" AFTER DELETE ON "Show" REFERENCING OLD TABLE AS old_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE count_upcoming_shows();
+'''
+
+# Row and table versions, the validators of conditional GETs. Every update
+# of a venue, artist or show bumps its version and updated_at, and a write
+# to a show touches its venue and artist, whose pages list it. Each
+# statement that writes to a table bumps the table's row in "TableVersion",
+# which the list pages check; writes made by other triggers follow from a
+# statement that has already been counted, so they are skipped and each
+# write only locks the version row of the table it names.
+VERSION_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+BEGIN
+  NEW.version := OLD.version + 1;
+  NEW.updated_at := now();
+  RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+  IF pg_trigger_depth() = 1 THEN
+    INSERT INTO "TableVersion" AS table_version (name, version, updated_at) VALUES (TG_TABLE_NAME, 1, now())
+      ON CONFLICT (name) DO UPDATE SET version = table_version.version + 1, updated_at = now();
+  END IF;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION touch_booked() RETURNS trigger AS $$
+DECLARE
+  venue_ids integer[];
+  artist_ids integer[];
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    venue_ids := ARRAY(SELECT DISTINCT venue_id FROM old_shows);
+    artist_ids := ARRAY(SELECT DISTINCT artist_id FROM old_shows);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    venue_ids := venue_ids || ARRAY(SELECT DISTINCT venue_id FROM new_shows);
+    artist_ids := artist_ids || ARRAY(SELECT DISTINCT artist_id FROM new_shows);
+  END IF;
+  -- Rows are locked in id order, so that concurrent bookings cannot deadlock.
+  PERFORM 1 FROM "Venue" WHERE id = ANY(venue_ids) ORDER BY id FOR UPDATE;
+  UPDATE "Venue" SET updated_at = now() WHERE id = ANY(venue_ids);
+  PERFORM 1 FROM "Artist" WHERE id = ANY(artist_ids) ORDER BY id FOR UPDATE;
+  UPDATE "Artist" SET updated_at = now() WHERE id = ANY(artist_ids);
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Venue_row_version" BEFORE UPDATE ON "Venue"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Artist_row_version" BEFORE UPDATE ON "Artist"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Show_row_version" BEFORE UPDATE ON "Show"
+  FOR EACH ROW EXECUTE PROCEDURE bump_row_version();
+CREATE TRIGGER "Venue_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Venue"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Artist_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Artist"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Show_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Show"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Area_table_version" BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE ON "Area"
+  FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version();
+CREATE TRIGGER "Show_touch_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_touch_update" AFTER UPDATE ON "Show" REFERENCING OLD TABLE AS old_shows NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+CREATE TRIGGER "Show_touch_delete" AFTER DELETE ON "Show" REFERENCING OLD TABLE AS old_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE touch_booked();
+'''
+
+# Stands in for exclusion constraints, which partitioned tables cannot have.
+# Bookings of a venue, and of an artist, take turns on an advisory lock, so
+# that two transactions cannot both miss each other's overlapping show. A
+# statement that books several shows must take them all up front, through
+# lock_bookings(), or it can deadlock against a booking that holds a venue
+# and waits for an artist; the trigger's own locks are then no-ops. The
+# errors name the former constraints and give the same detail, the clashing
+# keys, as the form and the importer expect.
+BOOKING_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION check_show_booking() RETURNS trigger AS $$
+DECLARE
+  other record;
+BEGIN
+  PERFORM pg_advisory_xact_lock(1, NEW.venue_id);
+  PERFORM pg_advisory_xact_lock(2, NEW.artist_id);
+  SELECT venue_id, start_time, end_time INTO other FROM "Show"
+    WHERE int4range(venue_id, venue_id, '[]') && int4range(NEW.venue_id, NEW.venue_id, '[]')
+      AND tsrange(start_time, end_time) && tsrange(NEW.start_time, NEW.end_time)
+      AND id <> NEW.id
+    LIMIT 1;
+  IF FOUND THEN
+    RAISE EXCEPTION 'The venue already has a show at that time'
+      USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'ex_Show_venue_booking', TABLE = 'Show',
+            DETAIL = 'Key (venue_id, tsrange(start_time, end_time))=(' || NEW.venue_id || ', '
+              || tsrange(NEW.start_time, NEW.end_time) || ') conflicts with existing key (venue_id, '
+              || 'tsrange(start_time, end_time))=(' || other.venue_id || ', '
+              || tsrange(other.start_time, other.end_time) || ').';
+  END IF;
+  SELECT artist_id, start_time, end_time INTO other FROM "Show"
+    WHERE int4range(artist_id, artist_id, '[]') && int4range(NEW.artist_id, NEW.artist_id, '[]')
+      AND tsrange(start_time, end_time) && tsrange(NEW.start_time, NEW.end_time)
+      AND id <> NEW.id
+    LIMIT 1;
+  IF FOUND THEN
+    RAISE EXCEPTION 'The artist is already booked at that time'
+      USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'ex_Show_artist_booking', TABLE = 'Show',
+            DETAIL = 'Key (artist_id, tsrange(start_time, end_time))=(' || NEW.artist_id || ', '
+              || tsrange(NEW.start_time, NEW.end_time) || ') conflicts with existing key (artist_id, '
+              || 'tsrange(start_time, end_time))=(' || other.artist_id || ', '
+              || tsrange(other.start_time, other.end_time) || ').';
+  END IF;
+  RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Show_booking" BEFORE INSERT OR UPDATE OF venue_id, artist_id, start_time, end_time ON "Show"
+  FOR EACH ROW EXECUTE PROCEDURE check_show_booking();
+'''
+
+# Shows of the months that have no partition yet, see partitions.py.
+SHOW_DEFAULT_PARTITION = 'CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT'
+
+# Area, Artist and Venue sort before Show, so every table exists by now.
+event.listen(Show.__table__, 'after_create', DDL(SHOW_DEFAULT_PARTITION))
+event.listen(Show.__table__, 'after_create', DDL(AREA_TRIGGERS))
+event.listen(Show.__table__, 'after_create', DDL(VERSION_TRIGGERS))
+event.listen(Show.__table__, 'after_create', DDL(BOOKING_TRIGGERS))
+
+# Keeps "ShowCard" current in the transaction that writes a show, or the
+# name, image or timezone of its venue or artist. Deleted shows take their
+# cards with them through the foreign key.
+SHOW_CARDS = '''
+INSERT INTO "ShowCard" AS card (show_id, start_time, venue_id, venue_name, venue_image_link, venue_timezone,
+                                artist_id, artist_name, artist_image_link)
+  SELECT shows.id, shows.start_time, "Venue".id, "Venue".name, "Venue".image_link, "Venue".timezone,
+         "Artist".id, "Artist".name, "Artist".image_link
+  FROM {shows} shows
+  JOIN "Venue" ON "Venue".id = shows.venue_id
+  JOIN "Artist" ON "Artist".id = shows.artist_id
+  ON CONFLICT (show_id) DO UPDATE SET
+    start_time = EXCLUDED.start_time, venue_id = EXCLUDED.venue_id, venue_name = EXCLUDED.venue_name,
+    venue_image_link = EXCLUDED.venue_image_link, venue_timezone = EXCLUDED.venue_timezone,
+    artist_id = EXCLUDED.artist_id, artist_name = EXCLUDED.artist_name,
+    artist_image_link = EXCLUDED.artist_image_link
+'''
+
+SHOW_CARD_TRIGGERS = '''
+CREATE OR REPLACE FUNCTION write_show_cards() RETURNS trigger AS $$
+BEGIN
+  %s;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rename_venue_cards() RETURNS trigger AS $$
+BEGIN
+  UPDATE "ShowCard" SET venue_name = NEW.name, venue_image_link = NEW.image_link, venue_timezone = NEW.timezone
+    WHERE venue_id = NEW.id;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rename_artist_cards() RETURNS trigger AS $$
+BEGIN
+  UPDATE "ShowCard" SET artist_name = NEW.name, artist_image_link = NEW.image_link
+    WHERE artist_id = NEW.id;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Show_card_insert" AFTER INSERT ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE write_show_cards();
+CREATE TRIGGER "Show_card_update" AFTER UPDATE ON "Show" REFERENCING NEW TABLE AS new_shows
+  FOR EACH STATEMENT EXECUTE PROCEDURE write_show_cards();
+CREATE TRIGGER "Venue_card_update" AFTER UPDATE ON "Venue" FOR EACH ROW
+  WHEN ((OLD.name, OLD.image_link, OLD.timezone) IS DISTINCT FROM (NEW.name, NEW.image_link, NEW.timezone))
+  EXECUTE PROCEDURE rename_venue_cards();
+CREATE TRIGGER "Artist_card_update" AFTER UPDATE ON "Artist" FOR EACH ROW
+  WHEN ((OLD.name, OLD.image_link) IS DISTINCT FROM (NEW.name, NEW.image_link))
+  EXECUTE PROCEDURE rename_artist_cards();
+''' % SHOW_CARDS.format(shows='new_shows').strip()
+
+event.listen(ShowCard.__table__, 'after_create', DDL(SHOW_CARD_TRIGGERS))
+
+def lock_bookings(venue_ids, artist_ids):
+    """Take the booking trigger's advisory locks for every venue, then every
+    artist, each in ascending id order, until the end of the transaction."""
+    for key, ids in ((1, venue_ids), (2, artist_ids)):
+        db.session.execute('SELECT pg_advisory_xact_lock(:key, id) FROM '
+                           '(SELECT id FROM unnest(CAST(:ids AS integer[])) AS id ORDER BY id) ids',
+                           {'key': key, 'ids': sorted(set(ids))})
+
+def recount_areas():
+    """Recount every area, e.g. to drop the shows that have started since."""
+    db.session.execute('SELECT recount_area(city, state) FROM (SELECT DISTINCT city, state FROM "Venue" '
+                       'WHERE city IS NOT NULL AND state IS NOT NULL ORDER BY city, state) areas')
+
+def rebuild_show_cards():
+    """Repopulate "ShowCard" from every show, e.g. after a restore that
+    bypassed the triggers."""
+    db.session.execute('TRUNCATE "ShowCard"')
+    db.session.execute(SHOW_CARDS.format(shows='"Show"'))
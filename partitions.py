@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# Show partitions.
+#----------------------------------------------------------------------------#
+
+import re
+from datetime import date
+
+from models import db, SHOW_CARDS
+
+PARTITION_NAME = re.compile(r'^Show_(\d{4})_(\d{2})$')
+
+
+def month_start(day):
+  return date(day.year, day.month, 1)
+
+def add_months(first, months):
+  month = first.year * 12 + first.month - 1 + months
+  return date(month // 12, month % 12 + 1, 1)
+
+def partition_name(first):
+  return 'Show_%04d_%02d' % (first.year, first.month)
+
+
+def show_partitions():
+  """The monthly partitions of "Show", as (first day, name) in order."""
+  names = [row[0] for row in db.session.execute(
+    'SELECT child.relname FROM pg_inherits '
+    'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+    'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+    'WHERE parent.relname = \'Show\'')]
+  partitions = []
+  for name in names:
+    match = PARTITION_NAME.match(name)
+    if match:
+      partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+  return sorted(partitions)
+
+
+def create_show_partition(first):
+  """Create and attach the partition of the shows starting in ``first``'s month.
+
+  Shows of that month booked before it existed wait in "Show_default" and
+  are moved over. Deleting them there also deletes their cards, so those
+  are written again once the partition is attached.
+  """
+  first = month_start(first)
+  name = partition_name(first)
+  bounds = {'first': first, 'end': add_months(first, 1)}
+  db.session.execute('CREATE TABLE "%s" (LIKE "Show" INCLUDING DEFAULTS)' % name)
+  moved = db.session.execute(
+    'WITH moved AS (DELETE FROM "Show_default" WHERE start_time >= :first AND start_time < :end RETURNING *) '
+    'INSERT INTO "%s" SELECT * FROM moved' % name, bounds).rowcount
+  db.session.execute('ALTER TABLE "Show" ATTACH PARTITION "%s" FOR VALUES FROM (:first) TO (:end)' % name,
+                     bounds)
+  if moved:
+    db.session.execute(SHOW_CARDS.format(shows='"%s"' % name))
+  return name
+
+
+def archive_show_partition(name, tablespace):
+  """Move a partition and its indexes to ``tablespace``. It stays attached,
+  so its shows are still listed, and deleted with their venue or artist."""
+  indexes = [row[0] for row in db.session.execute(
+    'SELECT indexname FROM pg_indexes WHERE tablename = :name', {'name': name})]
+  db.session.execute('ALTER TABLE "%s" SET TABLESPACE "%s"' % (name, tablespace))
+  for index in indexes:
+    db.session.execute('ALTER INDEX "%s" SET TABLESPACE "%s"' % (index, tablespace))
+
+
+def partition_tablespace(name):
+  return db.session.execute(
+    'SELECT pg_tablespace.spcname FROM pg_class '
+    'LEFT JOIN pg_tablespace ON pg_tablespace.oid = pg_class.reltablespace '
+    'WHERE pg_class.relname = :name', {'name': name}).scalar()
+
+
+def maintain_show_partitions(months_ahead, archive_after=None, tablespace=None, today=None):
+  """Create the partitions from this month to ``months_ahead`` months on,
+  and move those of months ending ``archive_after`` months ago or earlier
+  to ``tablespace``. Returns the names created and archived."""
+  this_month = month_start(today or date.today())
+  existing = dict(show_partitions())
+  created = []
+  for months in range(months_ahead + 1):
+    first = add_months(this_month, months)
+    if first not in existing:
+      created.append(create_show_partition(first))
+
+  archived = []
+  if archive_after is not None and tablespace:
+    cutoff = add_months(this_month, -archive_after)
+    for first, name in sorted(existing.items()):
+      if add_months(first, 1) <= cutoff and partition_tablespace(name) != tablespace:
+        archive_show_partition(name, tablespace)
+        archived.append(name)
+  return created, archived
@@ -0,0 +1,28 @@
+# Production settings: everything from config.py, with the overrides below.
+# Selected with FYYUR_CONFIG=production (wsgi.py does this by default).
+import os
+import tempfile
+
+from config import *
+
+# Every worker must sign sessions and CSRF tokens with the same key, so it is
+# supplied from outside instead of generated per process.
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+  raise RuntimeError('SECRET_KEY must be set in the environment for the production config')
+
+# gunicorn.conf.py forks several workers, and an in-process page cache would
+# only be invalidated in the worker that handled the write (or not at all,
+# for the CLI commands), so the others would keep serving stale pages.
+if PAGE_CACHE_BACKEND != 'redis':
+  raise RuntimeError('PAGE_CACHE_BACKEND=redis (and PAGE_CACHE_URL) must be set for the production config')
+
+DEBUG = False
+TEMPLATES_AUTO_RELOAD = False
+
+# Compiled templates are written here and shared by every worker and restart
+JINJA_BYTECODE_CACHE_DIR = os.environ.get(
+  'JINJA_BYTECODE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'fyyur-jinja'))
+
+# Bundled, fingerprinted and precompressed files, built at deploy time
+USE_BUILT_ASSETS = True
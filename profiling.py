@@ -0,0 +1,106 @@
+#----------------------------------------------------------------------------#
+# Request profiling.
+#----------------------------------------------------------------------------#
+
+import json
+import logging
+import time
+from logging import Formatter, FileHandler
+
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def timed_template(template_class):
+  """A Template class adding the time spent in render() to g.render_time.
+  Extended and included templates render inside their page's call, so each
+  page is counted once; queries run lazily by a template count in both."""
+  class TimedTemplate(template_class):
+    def render(self, *args, **kwargs):
+      if not has_app_context() or 'render_time' not in g:
+        return super(TimedTemplate, self).render(*args, **kwargs)
+      start = time.perf_counter()
+      try:
+        return super(TimedTemplate, self).render(*args, **kwargs)
+      finally:
+        g.render_time += time.perf_counter() - start
+  return TimedTemplate
+
+
+class QueryProfiler(object):
+  """Records the SQL each request issues and how long it spends in the database.
+
+  Adds a Server-Timing header (db, template render and total time, statement
+  count) to every response and writes requests slower than
+  SLOW_REQUEST_THRESHOLD_MS, with their slowest statements, as JSON lines to
+  SLOW_REQUEST_LOG. Only active when SQL_PROFILING is set.
+  """
+
+  def __init__(self, app=None):
+    self.logger = logging.getLogger('fyyur.slow_requests')
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    if not app.config['SQL_PROFILING']:
+      return
+    self.threshold = app.config['SLOW_REQUEST_THRESHOLD_MS']
+    self.top_queries = app.config['SLOW_REQUEST_TOP_QUERIES']
+
+    if not self.logger.handlers:
+      handler = FileHandler(app.config['SLOW_REQUEST_LOG'])
+      handler.setFormatter(Formatter('%(message)s'))
+      self.logger.addHandler(handler)
+      self.logger.setLevel(logging.INFO)
+      self.logger.propagate = False
+
+    if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+      event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+      event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+    # Flask's template signals need blinker, which is not installed, so the
+    # templates time themselves.
+    app.jinja_env.template_class = timed_template(app.jinja_env.template_class)
+    app.before_request(self._start_request)
+    app.after_request(self._finish_request)
+
+  def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+  def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    if has_app_context() and 'sql_queries' in g:
+      g.sql_queries.append((elapsed, statement))
+
+  def _start_request(self):
+    g.request_start_time = time.perf_counter()
+    g.render_time = 0
+    g.sql_queries = []
+
+  def _finish_request(self, response):
+    if 'sql_queries' not in g:
+      return response
+    total_ms = (time.perf_counter() - g.request_start_time) * 1000
+    db_ms = sum(elapsed for elapsed, statement in g.sql_queries) * 1000
+    count = len(g.sql_queries)
+    response.headers.add('Server-Timing', 'db;dur=%.2f;desc="%d queries"' % (db_ms, count))
+    response.headers.add('Server-Timing', 'render;dur=%.2f' % (g.render_time * 1000))
+    response.headers.add('Server-Timing', 'total;dur=%.2f' % total_ms)
+
+    if total_ms >= self.threshold:
+      slowest = sorted(g.sql_queries, key=lambda query: query[0], reverse=True)[:self.top_queries]
+      self.logger.info(json.dumps({
+        'method': request.method,
+        'path': request.full_path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        'db_ms': round(db_ms, 2),
+        'render_ms': round(g.render_time * 1000, 2),
+        'query_count': count,
+        'slowest_queries': [
+          {'duration_ms': round(elapsed * 1000, 2), 'sql': statement}
+          for elapsed, statement in slowest
+        ]
+      }))
+    return response
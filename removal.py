@@ -0,0 +1,63 @@
+#----------------------------------------------------------------------------#
+# Bulk removal.
+#----------------------------------------------------------------------------#
+
+import json
+
+from flask import request, abort
+
+from exporter import to_json
+from extensions import page_cache
+from models import db
+from typeahead import venue_names, artist_names
+
+REMOVABLE = {
+  'venues': ('Venue', 'venue_id', venue_names),
+  'artists': ('Artist', 'artist_id', artist_names),
+}
+
+
+def remove(kind, ids, archive=None):
+  """Delete venues or artists, and their shows, in one transaction.
+
+  The venues or artists go in one DELETE; their shows, show cards and area
+  counts follow in the same statement through the ON DELETE CASCADE keys
+  and the triggers. With ``archive``, a text file, the shows are deleted
+  first so that every removed venue or artist can be written to it as one
+  NDJSON line with its shows, before the commit. Returns the removed ids.
+  """
+  table, column, names = REMOVABLE[kind]
+  ids = sorted(set(ids))
+  try:
+    shows = {}
+    if archive is not None:
+      for show in db.session.execute('DELETE FROM "Show" WHERE %s = ANY(:ids) RETURNING *' % column,
+                                     {'ids': ids}):
+        shows.setdefault(show[column], []).append(dict((key, to_json(value)) for key, value in show.items()))
+    rows = db.session.execute('DELETE FROM "%s" WHERE id = ANY(:ids) RETURNING %s'
+                              % (table, '*' if archive is not None else 'id'), {'ids': ids}).fetchall()
+    if archive is not None:
+      for row in rows:
+        entity = dict((key, to_json(value)) for key, value in row.items())
+        entity['shows'] = shows.get(row.id, [])
+        archive.write(json.dumps(entity))
+        archive.write('\n')
+    db.session.commit()
+  except:
+    db.session.rollback()
+    raise
+
+  removed = sorted(row.id for row in rows)
+  names.remove(*removed)
+  # Their shows leave the feed and the upcoming counts of the venue list.
+  page_cache.invalidate('list:venues', 'list:artists', 'list:shows',
+                        *['%s:%d' % (kind[:-1], entity_id) for entity_id in removed])
+  return removed
+
+
+def requested_ids():
+  """The ids of a bulk request, as a JSON body {"ids": [1, 2, 3]}."""
+  ids = (request.get_json(silent=True) or {}).get('ids')
+  if not isinstance(ids, list) or not all(isinstance(entity_id, int) for entity_id in ids):
+    abort(400)
+  return ids
@@ -0,0 +1,72 @@
+#----------------------------------------------------------------------------#
+# Read-replica routing.
+#----------------------------------------------------------------------------#
+
+import time
+from functools import wraps
+
+from flask import current_app, g, request, session, has_app_context, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+
+REPLICA_BIND = 'replica'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(SignallingSession):
+  """Sends the reads of a replica-routed request to the ``replica`` bind.
+
+  Flushes always go to the primary, so a stray write can never land on the
+  replica.
+  """
+
+  def get_bind(self, mapper=None, clause=None):
+    if not self._flushing and has_app_context() and g.get('read_replica'):
+      return get_state(self.app).db.get_engine(self.app, bind=REPLICA_BIND)
+    return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+  def create_session(self, options):
+    return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter(object):
+  """Routes GET/HEAD requests, and views marked read_only, to the replica.
+
+  Only active when SQLALCHEMY_BINDS has a ``replica`` entry. A commit made
+  while handling a request pins that client to the primary for
+  REPLICA_STICKY_SECONDS, so it reads its own writes despite replication
+  lag; other clients may see them a little later.
+  """
+
+  def __init__(self, app=None):
+    if app is not None:
+      self.init_app(app)
+
+  def init_app(self, app):
+    app.before_request(self._route_request)
+    if not event.contains(RoutingSession, 'after_commit', self._pin_to_primary):
+      event.listen(RoutingSession, 'after_commit', self._pin_to_primary)
+
+  def enabled(self):
+    return bool((current_app.config['SQLALCHEMY_BINDS'] or {}).get(REPLICA_BIND))
+
+  def use_replica(self):
+    return self.enabled() and session.get('primary_until', 0) < time.time()
+
+  def read_only(self, view):
+    """Routes a view to the replica whatever its method, e.g. a search form POST."""
+    @wraps(view)
+    def wrapper(**kwargs):
+      g.read_replica = self.use_replica()
+      return view(**kwargs)
+    return wrapper
+
+  def _route_request(self):
+    g.read_replica = request.method in SAFE_METHODS and self.use_replica()
+
+  def _pin_to_primary(self, db_session):
+    if has_request_context() and self.enabled():
+      session['primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
@@ -0,0 +1,91 @@
+#----------------------------------------------------------------------------#
+# Recurring shows.
+#----------------------------------------------------------------------------#
+
+from calendar import monthrange
+from datetime import timedelta
+
+from models import db, Venue, Artist, Show, lock_bookings
+
+
+class ScheduleRejected(Exception):
+
+  def __init__(self, message, conflicts=()):
+    super(ScheduleRejected, self).__init__(message)
+    self.conflicts = conflicts
+
+
+def add_months(start_time, months):
+  # The 31st falls on the last day of shorter months.
+  month = start_time.year * 12 + start_time.month - 1 + months
+  year, month = month // 12, month % 12 + 1
+  return start_time.replace(year=year, month=month, day=min(start_time.day, monthrange(year, month)[1]))
+
+def occurrences(start_time, frequency, interval=1, until=None, count=None, limit=None):
+  """Start times of a weekly or monthly schedule: from ``start_time`` every
+  ``interval`` weeks or months, through the date ``until`` or ``count`` times.
+
+  Times are wall-clock times at the venue, so a show keeps its hour across
+  daylight saving changes. More than ``limit`` shows is an error.
+  """
+  starts = []
+  while count is None or len(starts) < count:
+    if frequency == 'weekly':
+      current = start_time + timedelta(weeks=interval * len(starts))
+    else:
+      current = add_months(start_time, interval * len(starts))
+    if until is not None and current.date() > until:
+      break
+    if limit is not None and len(starts) == limit:
+      raise ScheduleRejected('A schedule can list at most %d shows.' % limit)
+    starts.append(current)
+  return starts
+
+
+def schedule_shows(artist_id, venue_id, starts, length):
+  """Insert one show of ``length`` per start time, in one transaction.
+
+  Both ids are checked by one query and every show against the existing
+  bookings by another, through the booking indexes, so that a rejected
+  schedule names all of its conflicts. The venue and artist are locked
+  first, as the booking trigger would, so no show can be booked in between,
+  and the shows then go in as one multi-row INSERT. Returns the number of shows inserted.
+  """
+  periods = [(start_time, start_time + length) for start_time in starts]
+  artist_known, venue_known = db.session.query(
+    db.session.query(Artist.id).filter(Artist.id==artist_id).exists(),
+    db.session.query(Venue.id).filter(Venue.id==venue_id).exists()).one()
+  if not artist_known:
+    raise ScheduleRejected('There is no artist with ID %d.' % artist_id)
+  if not venue_known:
+    raise ScheduleRejected('There is no venue with ID %d.' % venue_id)
+  if any(end_time > later for (_, end_time), (later, _) in zip(periods, periods[1:])):
+    raise ScheduleRejected('The shows of a schedule cannot overlap each other.')
+  lock_bookings([venue_id], [artist_id])
+
+  conflicts = db.session.execute('''
+    SELECT wanted.start_time,
+           EXISTS (SELECT 1 FROM "Show"
+                   WHERE int4range(venue_id, venue_id, '[]') && int4range(:venue_id, :venue_id, '[]')
+                     AND tsrange(start_time, end_time) && tsrange(wanted.start_time, wanted.end_time)) AS venue,
+           EXISTS (SELECT 1 FROM "Show"
+                   WHERE int4range(artist_id, artist_id, '[]') && int4range(:artist_id, :artist_id, '[]')
+                     AND tsrange(start_time, end_time) && tsrange(wanted.start_time, wanted.end_time)) AS artist
+    FROM unnest(CAST(:starts AS timestamp[]), CAST(:ends AS timestamp[])) AS wanted (start_time, end_time)
+    ORDER BY wanted.start_time''', {
+      'venue_id': venue_id,
+      'artist_id': artist_id,
+      'starts': [start_time for start_time, _ in periods],
+      'ends': [end_time for _, end_time in periods]}).fetchall()
+  conflicts = [(row.start_time, 'venue' if row.venue else 'artist') for row in conflicts if row.venue or row.artist]
+  if conflicts:
+    raise ScheduleRejected('%d of the %d shows clash with existing bookings.' % (len(conflicts), len(periods)),
+                           conflicts)
+
+  db.session.execute(Show.__table__.insert().values([{
+    'artist_id': artist_id,
+    'venue_id': venue_id,
+    'start_time': start_time,
+    'end_time': end_time,
+  } for start_time, end_time in periods]))
+  return len(periods)
@@ -0,0 +1,58 @@
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+import re
+from datetime import datetime
+
+from models import db, Venue, Artist, Show, search_document
+
+
+def prefix_query(search_term):
+  # Every word must match as a prefix, so partial input still finds results.
+  words = re.findall(r'\w+', search_term.lower())
+  return ' & '.join(word + ':*' for word in words)
+
+
+def ranked(query, model, search_term, limit):
+  # Filter on the GIN-indexed document and order by relevance, falling back
+  # to alphabetical order when there is nothing to rank.
+  tsquery = prefix_query(search_term)
+  if tsquery:
+    document = search_document(model)
+    match = db.func.to_tsquery(db.text("'simple'"), tsquery)
+    query = query.filter(document.op('@@')(match)) \
+      .order_by(db.func.ts_rank(document, match).desc(), model.name)
+  else:
+    query = query.order_by(model.name)
+  return query.limit(limit).all()
+
+
+def find_venues(search_term, limit):
+  total = db.func.count().over().label('total')
+  num_upcoming_shows = db.func.count(Show.id).label('num_upcoming_shows')
+  query = db.session.query(Venue.id, Venue.name, num_upcoming_shows, total) \
+    .outerjoin(Show, db.and_(Show.venue_id==Venue.id, Show.start_time>datetime.now())) \
+    .group_by(Venue.id)
+  venues = ranked(query, Venue, search_term, limit)
+  return {
+    "count": venues[0].total if venues else 0,
+    "data": [{
+      "id": venue.id,
+      "name": venue.name,
+      "num_upcoming_shows": venue.num_upcoming_shows
+    } for venue in venues]
+  }
+
+
+def find_artists(search_term, limit):
+  total = db.func.count().over().label('total')
+  query = db.session.query(Artist.id, Artist.name, total)
+  artists = ranked(query, Artist, search_term, limit)
+  return {
+    "count": artists[0].total if artists else 0,
+    "data": [{
+      "id": artist.id,
+      "name": artist.name
+    } for artist in artists]
+  }
@@ -0,0 +1,242 @@
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort
+from sqlalchemy.exc import IntegrityError
+
+from conditional import conditional, table_versions
+from dates import format_datetimes
+from extensions import page_cache
+from models import db, Venue, Artist, Show, ShowCard, id_range, show_period
+from schedule import ScheduleRejected, occurrences, schedule_shows
+
+bp = Blueprint('shows', __name__)
+
+
+def parse_show_cursor(cursor):
+  # Cursors are "<start_time isoformat>_<show id>", the last row of the previous page.
+  try:
+    start_time, show_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(start_time), int(show_id)
+  except ValueError:
+    abort(400)
+
+def shows_version():
+  # The feed names venues and artists; upcoming and past change with the clock.
+  shows_at = datetime.now() if request.args.get('when') in ('upcoming', 'past') else None
+  return table_versions('Artist', 'Show', 'Venue', shows_at=shows_at)
+
+@bp.route('/shows')
+@conditional(shows_version)
+@page_cache.cached('list:shows')
+def shows():
+  when = request.args.get('when')
+  venue_id = request.args.get('venue_id', type=int)
+  artist_id = request.args.get('artist_id', type=int)
+  cursor = request.args.get('after')
+  per_page = current_app.config['SHOWS_PER_PAGE']
+
+  # Every tile comes from the one narrow ShowCard table, no joins.
+  query = db.session.query(
+      ShowCard.show_id.label('id'), ShowCard.start_time, ShowCard.venue_id, ShowCard.artist_id,
+      ShowCard.venue_name, ShowCard.venue_timezone, ShowCard.artist_name, ShowCard.artist_image_link)
+  if when == 'upcoming':
+    query = query.filter(ShowCard.start_time>datetime.now())
+  elif when == 'past':
+    query = query.filter(ShowCard.start_time<datetime.now())
+  if venue_id is not None:
+    query = query.filter(ShowCard.venue_id==venue_id)
+  if artist_id is not None:
+    query = query.filter(ShowCard.artist_id==artist_id)
+
+  # Seek past the cursor on (start_time, id) instead of using OFFSET; past
+  # shows are listed most recent first.
+  position = db.tuple_(ShowCard.start_time, ShowCard.show_id)
+  descending = when == 'past'
+  if cursor:
+    last_seen = db.tuple_(*parse_show_cursor(cursor))
+    query = query.filter(position<last_seen if descending else position>last_seen)
+  if descending:
+    query = query.order_by(ShowCard.start_time.desc(), ShowCard.show_id.desc())
+  else:
+    query = query.order_by(ShowCard.start_time, ShowCard.show_id)
+  shows = query.limit(per_page + 1).all()
+
+  next_url = None
+  if len(shows) > per_page:
+    shows = shows[:per_page]
+    last = shows[-1]
+    next_url = url_for('shows.shows', when=when, venue_id=venue_id, artist_id=artist_id,
+                       after='%s_%d' % (last.start_time.isoformat(), last.id))
+
+  start_times = format_datetimes([show.start_time for show in shows], 'full', [show.venue_timezone for show in shows])
+  data = []
+  for show, formatted_start_time in zip(shows, start_times):
+    page_cache.tag('venue:%d' % show.venue_id, 'artist:%d' % show.artist_id)
+    data.append({
+      "venue_id" : show.venue_id,
+      "artist_id": show.artist_id,
+      "start_time": show.start_time,
+      "formatted_start_time": formatted_start_time,
+      "artist_name": show.artist_name,
+      "venue_name": show.venue_name,
+      "artist_image_link": show.artist_image_link
+  })
+
+  return render_template('pages/shows.html', shows=data, next_url=next_url)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+# Messages for the constraints a new show can violate.
+BOOKING_ERRORS = {
+  'Show_artist_id_fkey': 'There is no artist with ID {artist_id}.',
+  'Show_venue_id_fkey': 'There is no venue with ID {venue_id}.',
+  'ex_Show_venue_booking': 'The venue already has a show at that time.',
+  'ex_Show_artist_booking': 'The artist is already booked at that time.',
+}
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  from forms import ShowForm
+  form = ShowForm(request.form)
+  if not form.validate():
+    for field, errors in form.errors.items():
+      flash('%s: %s' % (field, ' '.join(errors)))
+    return render_template('forms/new_show.html', form=form), 400
+
+  # Unknown ids and double bookings are left to the foreign keys and the
+  # booking trigger, so the check is one indexed insert.
+  error = None
+  try:
+    show = Show(
+      artist_id = form.artist_id.data,
+      venue_id = form.venue_id.data,
+      start_time = form.start_time.data,
+      end_time = form.end_time.data or
+        form.start_time.data + timedelta(hours=current_app.config['SHOW_LENGTH_HOURS']),
+    )
+    db.session.add(show)
+    db.session.commit()
+    page_cache.invalidate('venue:%d:shows' % show.venue_id, 'artist:%d:shows' % show.artist_id, 'list:shows')
+    flash('Show was successfully listed!')
+
+  except IntegrityError as e:
+    db.session.rollback()
+    error = BOOKING_ERRORS.get(e.orig.diag.constraint_name, 'Show could not be listed.').format(**form.data)
+  except:
+    db.session.rollback()
+    error = 'Show could not be listed.'
+  finally:
+    db.session.close()
+  if error:
+    flash('An error occurred. ' + error)
+    return render_template('forms/new_show.html', form=form), 409
+  else:
+    return redirect(url_for('shows.shows'))
+
+#  Recurring shows
+#  ----------------------------------------------------------------
+
+@bp.route('/shows/schedule')
+def create_schedule():
+  from forms import ScheduleForm
+  form = ScheduleForm()
+  return render_template('forms/new_schedule.html', form=form)
+
+@bp.route('/shows/schedule', methods=['POST'])
+def create_schedule_submission():
+  from forms import ScheduleForm
+  form = ScheduleForm(request.form)
+  if not form.validate():
+    for field, errors in form.errors.items():
+      flash('%s: %s' % (field, ' '.join(errors)))
+    return render_template('forms/new_schedule.html', form=form), 400
+
+  # A few statements for the whole schedule: the ids, the conflicts and
+  # one multi-row insert, committed together or not at all.
+  error = None
+  conflicts = ()
+  try:
+    starts = occurrences(form.start_time.data, form.frequency.data, form.interval.data or 1,
+                         until=form.until.data, count=form.count.data,
+                         limit=current_app.config['SCHEDULE_MAX_SHOWS'])
+    length = (form.end_time.data or
+      form.start_time.data + timedelta(hours=current_app.config['SHOW_LENGTH_HOURS'])) - form.start_time.data
+    listed = schedule_shows(form.artist_id.data, form.venue_id.data, starts, length)
+    db.session.commit()
+    page_cache.invalidate('venue:%d:shows' % form.venue_id.data, 'artist:%d:shows' % form.artist_id.data,
+                          'list:shows')
+    flash('%d shows were successfully listed!' % listed)
+
+  except ScheduleRejected as e:
+    db.session.rollback()
+    error, conflicts = str(e), e.conflicts
+  except IntegrityError as e:
+    db.session.rollback()
+    error = BOOKING_ERRORS.get(e.orig.diag.constraint_name, 'Shows could not be listed.').format(**form.data)
+  except:
+    db.session.rollback()
+    error = 'Shows could not be listed.'
+  finally:
+    db.session.close()
+  if error:
+    flash('An error occurred. ' + error)
+    for start_time, booked in conflicts:
+      flash('%s: the %s is already booked.' % (start_time.strftime('%Y-%m-%d %H:%M'), booked))
+    return render_template('forms/new_schedule.html', form=form), 409
+  else:
+    return redirect(url_for('shows.shows', artist_id=form.artist_id.data, venue_id=form.venue_id.data))
+
+#  Calendars
+#  ----------------------------------------------------------------
+
+def calendar_range():
+  # ?from=&to= as ISO dates or datetimes; the next 31 days by default.
+  try:
+    start = datetime.fromisoformat(request.args['from']) if 'from' in request.args \
+      else datetime.combine(datetime.today(), datetime.min.time())
+    end = datetime.fromisoformat(request.args['to']) if 'to' in request.args \
+      else start + timedelta(days=31)
+  except ValueError:
+    abort(400)
+  if end <= start or end - start > timedelta(days=current_app.config['CALENDAR_MAX_DAYS']):
+    abort(400)
+  return start, end
+
+def calendar(column, entity_id, start, end):
+  """Shows of one venue or artist overlapping [start, end), in order.
+
+  The filters repeat the booking indexes' expressions, so the range lookup
+  is served by those gist indexes.
+  """
+  shows = db.session.query(
+      Show.id, Show.start_time, Show.end_time, Show.venue_id, Show.artist_id,
+      Venue.name.label('venue_name'),
+      Artist.name.label('artist_name')) \
+    .join(Venue, Venue.id==Show.venue_id) \
+    .join(Artist, Artist.id==Show.artist_id) \
+    .filter(id_range(column).op('&&')(id_range(entity_id))) \
+    .filter(show_period(Show.start_time, Show.end_time).op('&&')(show_period(start, end))) \
+    .order_by(Show.start_time) \
+    .all()
+  data = []
+  for show in shows:
+    page_cache.tag('venue:%d' % show.venue_id, 'artist:%d' % show.artist_id)
+    data.append({
+      "id": show.id,
+      "start_time": show.start_time.isoformat(),
+      "end_time": show.end_time.isoformat(),
+      "venue_id": show.venue_id,
+      "venue_name": show.venue_name,
+      "artist_id": show.artist_id,
+      "artist_name": show.artist_name
+    })
+  return data
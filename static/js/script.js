@@ -2,3 +2,29 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Fills the <datalist> of each search box with the names matching what has
+// been typed so far, from the box's data-typeahead endpoint.
+(function ($) {
+  var timers = {};
+  $(document).on('input', 'input[data-typeahead]', function () {
+    var input = this;
+    var list = document.getElementById(input.getAttribute('list'));
+    clearTimeout(timers[input.name]);
+    timers[input.name] = setTimeout(function () {
+      var q = $.trim(input.value);
+      if (!q) {
+        $(list).empty();
+        return;
+      }
+      $.getJSON(input.getAttribute('data-typeahead'), {q: q}, function (response) {
+        if ($.trim(input.value) !== q) {
+          return;
+        }
+        $(list).empty().append($.map(response.data, function (item) {
+          return $('<option>').attr('value', item.name)[0];
+        }));
+      });
+    }, 150);
+  });
+})(window.jQuery);
@@ -0,0 +1,113 @@
+#----------------------------------------------------------------------------#
+# JSON API tests.
+#
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test \
+#     python test_api.py -v
+#----------------------------------------------------------------------------#
+
+import os
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from extensions import page_cache
+from models import db, Venue, Artist, Show
+from test_queries import count_queries
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+app = create_app(migrations=False)
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL is not set')
+class ApiTestCase(unittest.TestCase):
+
+  def setUp(self):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+    db.app = app
+    self.client = app.test_client()
+    db.drop_all()
+    db.create_all()
+    page_cache.clear()
+
+    self.start = datetime(2099, 1, 1, 20, 0)
+    artist = Artist(name='The Wild Sax Band', city='San Francisco', state='CA', genres=['Jazz'])
+    db.session.add(artist)
+    for i in range(5):
+      venue = Venue(name='Hall %d' % i, city='Austin', state='TX', genres=['Jazz'])
+      db.session.add(venue)
+      for j in range(2):
+        start_time = self.start + timedelta(days=10 * i + j)
+        db.session.add(Show(Venue=venue, Artist=artist, start_time=start_time,
+                            end_time=start_time + timedelta(hours=3)))
+    db.session.commit()
+    self.artist_id = artist.id
+    db.session.remove()
+
+  def tearDown(self):
+    db.session.remove()
+    db.drop_all()
+
+  def get(self, url):
+    # Every response is built from scratch, so each counts its own statements.
+    page_cache.clear()
+    response = self.client.get(url)
+    return response, response.get_json()
+
+  def test_sparse_fieldsets_select_only_the_requested_columns(self):
+    with count_queries() as statements:
+      response, body = self.get('/api/v1/venues?fields=name,city')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(body['data'][0], {'id': body['data'][0]['id'], 'name': 'Hall 0', 'city': 'Austin'})
+    query = statements[-1]
+    self.assertNotIn('"Venue".address', query)
+    self.assertNotIn('"Venue".genres', query)
+
+    response, body = self.get('/api/v1/venues?fields=name,password')
+    self.assertEqual(response.status_code, 400)
+    self.assertIn('password', body['error'])
+
+  def test_lists_are_paged_by_cursor(self):
+    names = []
+    url = '/api/v1/venues?fields=name&limit=2'
+    while url:
+      response, body = self.get(url)
+      self.assertLessEqual(len(body['data']), 2)
+      names.extend(venue['name'] for venue in body['data'])
+      url = body['next']
+    self.assertEqual(names, ['Hall %d' % i for i in range(5)])
+    self.assertEqual(self.get('/api/v1/venues?after=last')[0].status_code, 400)
+    self.assertEqual(self.get('/api/v1/venues?limit=0')[0].status_code, 400)
+
+  def test_shows_embed_their_venue_and_artist_with_one_query_each(self):
+    starts = []
+    url = '/api/v1/shows?fields=start_time&fields[venues]=name&fields[artists]=name&include=venue,artist&limit=4'
+    while url:
+      with count_queries() as statements:
+        response, body = self.get(url)
+      # The validator, the page, its venues and its artist.
+      self.assertEqual(len(statements), 4, statements)
+      for show in body['data']:
+        self.assertEqual(set(show), {'id', 'start_time', 'venue', 'artist'})
+        self.assertEqual(show['artist'], {'id': self.artist_id, 'name': 'The Wild Sax Band'})
+        starts.append(show['start_time'])
+      url = body['next']
+    self.assertEqual(len(starts), 10)
+    self.assertEqual(starts[0], self.start.isoformat())
+    self.assertEqual(starts, sorted(starts))
+
+  def test_detail_pages_embed_their_shows(self):
+    response, body = self.get('/api/v1/artists/%d?fields=name&include=shows&fields[shows]=venue_id' % self.artist_id)
+    self.assertEqual(body['data']['name'], 'The Wild Sax Band')
+    self.assertEqual(len(body['data']['shows']), 10)
+    self.assertEqual(set(body['data']['shows'][0]), {'id', 'venue_id'})
+
+    response, body = self.get('/api/v1/artists/0')
+    self.assertEqual(response.status_code, 404)
+    self.assertEqual(body['error'], 'No artist with ID 0')
+    self.assertEqual(self.get('/api/v1/shows?include=everything')[0].status_code, 400)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,90 @@
+#----------------------------------------------------------------------------#
+# Static asset pipeline tests.
+#
+# Builds static/ into a temporary directory; needs no database:
+#   python test_assets.py -v
+#----------------------------------------------------------------------------#
+
+import gzip
+import re
+import shutil
+import tempfile
+import unittest
+
+import brotli
+
+from app import create_app
+from assets import build
+
+app = create_app(migrations=False)
+
+
+class AssetPipelineTestCase(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.directory = tempfile.mkdtemp()
+    cls.manifest = build(app.static_folder, cls.directory)
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.directory)
+
+  def setUp(self):
+    app.config['TESTING'] = True
+    app.config['ASSETS_DIR'] = self.directory
+    app.config['USE_BUILT_ASSETS'] = True
+    self.client = app.test_client()
+
+  def tearDown(self):
+    app.config['USE_BUILT_ASSETS'] = False
+
+  def test_pages_link_the_fingerprinted_bundles(self):
+    page = self.client.get('/').data.decode('utf-8')
+    stylesheets = re.findall(r'rel="stylesheet" href="([^"]+)"', page)
+    self.assertEqual(stylesheets, ['/static/dist/' + self.manifest['files']['css/app.css']])
+    self.assertRegex(stylesheets[0], r'^/static/dist/css/app\.[0-9a-f]{12}\.css$')
+    self.assertIn('/static/dist/' + self.manifest['files']['js/head.js'], page)
+    self.assertIn('/static/dist/' + self.manifest['files']['js/app.js'], page)
+    self.assertNotIn('src="/static/js/', page)
+
+  def test_images_are_offered_resized_and_as_webp(self):
+    page = self.client.get('/').data.decode('utf-8')
+    webp = re.search(r'type="image/webp" srcset="([^"]+)"', page).group(1)
+    self.assertEqual([width for url, width in re.findall(r'(\S+) (\d+)w', webp)], ['480', '960', '1440'])
+    self.assertRegex(re.search(r'id="front-splash" src="([^"]+)"', page).group(1),
+                     r'^/static/dist/img/front-splash-1440\.[0-9a-f]{12}\.jpg$')
+
+  def test_bundles_are_served_precompressed_and_cached_for_good(self):
+    url = '/static/dist/' + self.manifest['files']['css/app.css']
+    plain = self.client.get(url)
+    self.assertEqual(plain.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+    self.assertNotIn('Content-Encoding', plain.headers)
+    self.assertIn('.navbar', plain.data.decode('utf-8'))
+    self.assertEqual(self.client.get(url, headers={'If-None-Match': plain.headers['ETag']}).status_code, 304)
+
+    for encoding, decompress in (('br', brotli.decompress), ('gzip', gzip.decompress)):
+      response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate, br' if encoding == 'br' else encoding})
+      self.assertEqual(response.headers['Content-Encoding'], encoding)
+      self.assertEqual(response.headers['Vary'], 'Accept-Encoding')
+      self.assertEqual(response.mimetype, 'text/css')
+      self.assertLess(len(response.data), len(plain.data) / 4)
+      self.assertEqual(decompress(response.data), plain.data)
+
+  def test_bundled_stylesheets_keep_their_relative_urls_working(self):
+    with open('%s/%s' % (self.directory, self.manifest['files']['css/app.css'])) as f:
+      css = f.read()
+    # bootstrap.min.css names ../fonts/ from static/css/, the bundle lives in dist/css/.
+    self.assertIn('url("../../fonts/glyphicons-halflings-regular.woff")', css)
+    self.assertNotIn('url("../fonts/', css)
+
+  def test_without_a_build_pages_link_the_sources(self):
+    app.config['USE_BUILT_ASSETS'] = False
+    page = self.client.get('/').data.decode('utf-8')
+    self.assertIn('href="/static/css/main.css"', page)
+    self.assertIn('src="/static/js/libs/moment.min.js"', page)
+    self.assertIn('src="/static/img/front-splash.jpg"', page)
+
+
+if __name__ == '__main__':
+  unittest.main()
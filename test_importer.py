@@ -0,0 +1,168 @@
+#----------------------------------------------------------------------------#
+# Bulk import tests.
+#
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test \
+#     python test_importer.py -v
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from app import create_app
+from importer import import_file, ImportAborted
+from models import db, Area, Venue, Artist, Show
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+app = create_app(migrations=False)
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL is not set')
+class ImportTestCase(unittest.TestCase):
+
+  def setUp(self):
+    app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+    self.context = app.app_context()
+    self.context.push()
+    db.drop_all()
+    db.create_all()
+    self.directory = tempfile.mkdtemp()
+
+  def tearDown(self):
+    db.session.remove()
+    db.drop_all()
+    self.context.pop()
+    shutil.rmtree(self.directory)
+
+  def write(self, name, content):
+    path = os.path.join(self.directory, name)
+    with open(path, 'w') as f:
+      f.write(content)
+    return path
+
+  def test_import_validates_rows_with_the_forms(self):
+    path = self.write('venues.csv', '\n'.join([
+      'name,city,state,address,genres,facebook_link,seeking_talent',
+      'The Musical Hop,San Francisco,CA,1015 Folsom Street,Jazz;Reggae,https://www.facebook.com/TheMusicalHop,True',
+      'Park Square,San Francisco,CA,34 Whiskey Moore Ave,Rock n Roll,https://www.facebook.com/ParkSquare,False',
+      'Nowhere,Atlantis,XX,1 Sea Floor,Jazz,not a url,False',
+    ]))
+    imported, errors = import_file('venues', path)
+    self.assertEqual(imported, 2)
+    self.assertEqual([number for number, row_errors in errors], [4])
+    self.assertEqual(sorted(errors[0][1]), ['facebook_link', 'state'])
+    hop = Venue.query.filter_by(name='The Musical Hop').one()
+    self.assertEqual(hop.genres, ['Jazz', 'Reggae'])
+    self.assertTrue(hop.seeking_talent)
+    self.assertFalse(Venue.query.filter_by(name='Park Square').one().seeking_talent)
+
+  def test_import_resolves_show_references(self):
+    artists = self.write('artists.ndjson', '\n'.join(json.dumps(artist) for artist in [
+      {'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA', 'genres': ['Rock n Roll'],
+       'facebook_link': 'https://www.facebook.com/GunsNPetals', 'seeking_venue': True},
+    ]))
+    venues = self.write('venues.csv', '\n'.join([
+      'name,city,state,address,genres,facebook_link',
+      'The Musical Hop,San Francisco,CA,1015 Folsom Street,Jazz,https://www.facebook.com/TheMusicalHop',
+    ]))
+    import_file('artists', artists)
+    import_file('venues', venues)
+    venue_id = Venue.query.one().id
+    shows = self.write('shows.csv', '\n'.join([
+      'artist_name,venue_id,start_time',
+      'Guns N Petals,%d,2035-04-01 20:00:00' % venue_id,
+      'Guns N Petals,%d,2035-04-08 20:00:00' % venue_id,
+      'Nobody,%d,2035-04-08 20:00:00' % venue_id,
+      'Guns N Petals,0,2035-04-08 20:00:00',
+    ]))
+
+    with self.assertRaises(ImportAborted):
+      import_file('shows', shows, strict=True)
+    self.assertEqual(Show.query.count(), 0)
+
+    imported, errors = import_file('shows', shows, batch_size=1)
+    self.assertEqual(imported, 2)
+    self.assertEqual([(number, sorted(row_errors)) for number, row_errors in errors],
+                     [(4, ['artist']), (5, ['venue'])])
+    self.assertEqual({show.artist_id for show in Show.query}, {Artist.query.one().id})
+    area = Area.query.one()
+    self.assertEqual((area.city, area.venue_count, area.upcoming_shows), ('San Francisco', 1, 2))
+
+    overlapping = self.write('overlapping.csv', '\n'.join([
+      'artist_name,venue_id,start_time,end_time',
+      'Guns N Petals,%d,2035-05-01 20:00:00,' % venue_id,
+      'Guns N Petals,%d,2035-04-01 22:00:00,2035-04-01 23:00:00' % venue_id,
+    ]))
+    with self.assertRaises(ImportAborted) as aborted:
+      import_file('shows', overlapping)
+    self.assertEqual(Show.query.count(), 2)
+    # The booking trigger describes the clash as the exclusion constraint did.
+    self.assertIn('Key (venue_id, tsrange(start_time, end_time))=(%d, ["2035-04-01 22:00:00","2035-04-01 23:00:00"))'
+                  ' conflicts with existing key' % venue_id, str(aborted.exception))
+    self.assertIn('["2035-04-01 20:00:00","2035-04-01 23:00:00")', str(aborted.exception))
+
+  def test_import_runs_the_inline_validators(self):
+    db.session.add(Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll']))
+    db.session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz']))
+    db.session.commit()
+    shows = self.write('shows.csv', '\n'.join([
+      'artist_name,venue_name,start_time,end_time',
+      'Guns N Petals,The Musical Hop,2035-04-01 20:00:00,2035-04-01 19:00:00',
+      'Guns N Petals,The Musical Hop,2035-04-08 20:00:00,2035-04-08 23:00:00',
+    ]))
+    imported, errors = import_file('shows', shows)
+    self.assertEqual(imported, 1)
+    self.assertEqual(errors, [(2, {'end_time': ['A show must end after it starts.']})])
+
+  def test_import_locks_every_booking_before_inserting(self):
+    for name in ('Guns N Petals', 'Matt Quevedo'):
+      db.session.add(Artist(name=name, city='San Francisco', state='CA', genres=['Jazz']))
+    for name in ('The Musical Hop', 'Park Square'):
+      db.session.add(Venue(name=name, city='San Francisco', state='CA', genres=['Jazz']))
+    db.session.commit()
+    petals, quevedo = [Artist.query.filter_by(name=name).one().id for name in ('Guns N Petals', 'Matt Quevedo')]
+    hop, park = [Venue.query.filter_by(name=name).one().id for name in ('The Musical Hop', 'Park Square')]
+    shows = self.write('shows.csv', '\n'.join([
+      'artist_id,venue_id,start_time',
+      '%d,%d,2035-04-01 20:00:00' % (petals, park),
+      '%d,%d,2035-04-08 20:00:00' % (quevedo, hop),
+    ]))
+
+    # Another booking has locked the venue and is about to lock the artist,
+    # as the trigger does, when the import starts.
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    connection.execute('SELECT pg_advisory_xact_lock(1, %d)' % hop)
+    outcome = {}
+    def run_import():
+      with app.app_context():
+        try:
+          outcome['imported'] = import_file('shows', shows)[0]
+        except Exception as e:
+          outcome['error'] = e
+        finally:
+          db.session.remove()
+    thread = threading.Thread(target=run_import)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not connection.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND NOT granted").scalar():
+      self.assertLess(time.monotonic(), deadline, 'the import never waited for the venue')
+      time.sleep(0.05)
+    connection.execute(Show.__table__.insert().values(
+      artist_id=petals, venue_id=hop, start_time='2035-05-01 20:00:00', end_time='2035-05-01 23:00:00'))
+    transaction.commit()
+    connection.close()
+    thread.join(10)
+
+    self.assertFalse(thread.is_alive())
+    self.assertEqual(outcome, {'imported': 2})
+    self.assertEqual(Show.query.count(), 3)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,92 @@
+#----------------------------------------------------------------------------#
+# Request profiling tests.
+#
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test \
+#     python test_profiling.py -v
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+import config
+from app import create_app
+from extensions import page_cache, query_profiler
+from facets import venue_genres
+from models import db, Venue
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+LOG_DIRECTORY = tempfile.mkdtemp()
+SLOW_REQUEST_LOG = os.path.join(LOG_DIRECTORY, 'slow_requests.log')
+
+settings = dict((key, getattr(config, key)) for key in dir(config) if key.isupper())
+settings.update(SQL_PROFILING=True, SLOW_REQUEST_LOG=SLOW_REQUEST_LOG)
+app = create_app(type('ProfilingConfig', (object,), settings), migrations=False)
+
+SERVER_TIMING = re.compile(r'^(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?$')
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL is not set')
+class QueryProfilerTestCase(unittest.TestCase):
+
+  def setUp(self):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+    db.app = app
+    self.client = app.test_client()
+    db.drop_all()
+    db.create_all()
+    page_cache.clear()
+    db.session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz']))
+    db.session.commit()
+    db.session.remove()
+    open(SLOW_REQUEST_LOG, 'w').close()
+
+  def tearDown(self):
+    db.session.remove()
+    db.drop_all()
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(LOG_DIRECTORY)
+
+  def timings(self, response):
+    entries = {}
+    for value in response.headers.getlist('Server-Timing'):
+      name, duration, queries = SERVER_TIMING.match(value).groups()
+      entries[name] = (float(duration), int(queries) if queries else None)
+    return entries
+
+  def logged(self):
+    with open(SLOW_REQUEST_LOG) as f:
+      return [json.loads(line) for line in f]
+
+  def test_server_timing_reports_db_and_render_time(self):
+    query_profiler.threshold = 60000
+    venue_genres.counts()
+    response = self.client.get('/venues')
+    timings = self.timings(response)
+    self.assertEqual(set(timings), {'db', 'render', 'total'})
+    # The validator and the area summary.
+    self.assertEqual(timings['db'][1], 2)
+    self.assertGreater(timings['render'][0], 0)
+    self.assertLessEqual(timings['db'][0] + timings['render'][0], timings['total'][0])
+    self.assertEqual(self.logged(), [])
+
+  def test_requests_over_the_threshold_are_logged(self):
+    query_profiler.threshold = 0
+    self.client.get('/venues?city=San%20Francisco&state=CA')
+    entry, = self.logged()
+    self.assertEqual((entry['method'], entry['endpoint'], entry['status']), ('GET', 'venues.venues', 200))
+    self.assertEqual(entry['path'], '/venues?city=San%20Francisco&state=CA')
+    self.assertEqual(entry['query_count'], len(entry['slowest_queries']))
+    self.assertIn('"Venue"', ' '.join(query['sql'] for query in entry['slowest_queries']))
+    self.assertGreaterEqual(entry['duration_ms'], entry['db_ms'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,619 @@
+#----------------------------------------------------------------------------#
+# Query budget tests.
+#
+# Run against a throwaway Postgres database (the models use ARRAY columns):
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test \
+#     python test_queries.py -v
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import template_rendered
+from sqlalchemy import event
+
+from app import create_app
+from cache import LocalCache
+from exporter import export_lines
+from extensions import page_cache
+from facets import venue_genres
+from models import db, Area, Venue, Artist, Show, ShowCard, recount_areas, rebuild_show_cards
+from partitions import maintain_show_partitions
+from removal import remove
+from typeahead import PrefixIndex, venue_names, artist_names
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+app = create_app(migrations=False)
+
+
+@contextmanager
+def count_queries(with_parameters=False):
+  statements = []
+
+  def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements.append((statement, parameters) if with_parameters else statement)
+
+  event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+  try:
+    yield statements
+  finally:
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def captured_templates():
+  recorded = []
+
+  def record(sender, template, context, **extra):
+    recorded.append((template, context))
+
+  template_rendered.connect(record, app)
+  try:
+    yield recorded
+  finally:
+    template_rendered.disconnect(record, app)
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL is not set')
+class QueryBudgetTestCase(unittest.TestCase):
+
+  def setUp(self):
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+    # Lets the tests use the session outside of a request.
+    db.app = app
+    self.client = app.test_client()
+    db.drop_all()
+    db.create_all()
+    venue_names.reset()
+    artist_names.reset()
+    page_cache.clear()
+    self.seed()
+
+  def tearDown(self):
+    db.session.remove()
+    db.drop_all()
+
+  def seed(self, venues_per_area=5, shows_per_venue=4):
+    now = datetime.now().replace(microsecond=0)
+    artist = Artist(name='The Wild Sax Band', city='San Francisco', state='CA', genres=['Jazz'])
+    db.session.add(artist)
+    venues = 0
+    for city, state in (('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX')):
+      for i in range(venues_per_area):
+        venue = Venue(name='%s Hall %d' % (city, i), city=city, state=state, genres=['Jazz'])
+        db.session.add(venue)
+        for j in range(shows_per_venue):
+          # The artist plays every venue, so each venue gets its own hours.
+          offset = timedelta(days=4 * j + 1, hours=4 * venues)
+          start_time = now + offset if j % 2 else now - offset
+          db.session.add(Show(Venue=venue, Artist=artist, start_time=start_time,
+                              end_time=start_time + timedelta(hours=3)))
+        venues += 1
+    db.session.commit()
+    db.session.remove()
+
+  def test_venues_issues_a_single_statement_after_its_validator(self):
+    # The genre facets are loaded once and then shared by every list page.
+    venue_genres.counts()
+    with count_queries() as statements:
+      response = self.client.get('/venues')
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(len(statements), 2, statements)
+    self.assertIn('"TableVersion"', statements[0])
+
+  def test_venues_counts_upcoming_shows_per_area(self):
+    db.session.add(Venue(name='Empty Room', city='Austin', state='TX', genres=['Jazz']))
+    db.session.commit()
+    with captured_templates() as templates:
+      self.client.get('/venues')
+      self.client.get('/venues?city=Austin&state=TX')
+    areas = templates[0][1]['areas']
+    self.assertEqual([(area['city'], area['state'], area['venue_count'], area['num_upcoming_shows'])
+                      for area in areas],
+                     [('Austin', 'TX', 6, 10), ('New York', 'NY', 5, 10), ('San Francisco', 'CA', 5, 10)])
+    austin, = templates[1][1]['areas']
+    venues = {venue['name']: venue['num_upcoming_shows'] for venue in austin['venues']}
+    self.assertEqual(venues['Empty Room'], 0)
+    self.assertEqual(venues['Austin Hall 0'], 2)
+    self.assertEqual((austin['venue_count'], austin['num_upcoming_shows']), (6, 10))
+
+  def test_area_summary_follows_writes(self):
+    def summary():
+      return [(area.city, area.venue_count, area.upcoming_shows)
+              for area in Area.query.order_by(Area.city, Area.state)]
+    self.assertEqual(summary(), [('Austin', 5, 10), ('New York', 5, 10), ('San Francisco', 5, 10)])
+
+    venue = Venue.query.filter_by(name='Austin Hall 0').one()
+    artist_id, venue_id = Artist.query.one().id, venue.id
+    db.session.remove()
+    self.client.post('/shows/create', data={
+      'artist_id': artist_id, 'venue_id': venue_id, 'start_time': '2099-01-01 20:00:00'})
+    self.client.post('/venues/%d/edit' % venue_id, data={
+      'name': 'Austin Hall 0', 'city': 'Portland', 'state': 'OR', 'address': '1 Main St',
+      'genres': 'Jazz', 'facebook_link': 'https://www.facebook.com/AustinHall'})
+    self.assertEqual(summary(), [('Austin', 4, 8), ('New York', 5, 10), ('Portland', 1, 3),
+                                 ('San Francisco', 5, 10)])
+
+    db.session.delete(Venue.query.get(venue_id))
+    db.session.commit()
+    self.assertEqual(summary(), [('Austin', 4, 8), ('New York', 5, 10), ('San Francisco', 5, 10)])
+
+    # Shows that have started are only dropped by a recount.
+    db.session.execute('UPDATE "Area" SET upcoming_shows = 0')
+    recount_areas()
+    self.assertEqual(summary(), [('Austin', 4, 8), ('New York', 5, 10), ('San Francisco', 5, 10)])
+
+  def test_show_cards_follow_writes(self):
+    def cards():
+      return sorted((card.venue_name, card.artist_name, card.artist_image_link)
+                    for card in ShowCard.query.filter(ShowCard.start_time>'2098-01-01'))
+    venue = Venue.query.filter_by(name='Austin Hall 0').one()
+    artist_id, venue_id = Artist.query.one().id, venue.id
+    self.assertEqual(ShowCard.query.count(), 60)
+    db.session.remove()
+
+    self.client.post('/shows/create', data={
+      'artist_id': artist_id, 'venue_id': venue_id, 'start_time': '2099-01-01 20:00:00'})
+    self.assertEqual(cards(), [('Austin Hall 0', 'The Wild Sax Band', None)])
+    self.client.post('/artists/%d/edit' % artist_id, data={
+      'name': 'The Tame Sax Band', 'city': 'San Francisco', 'state': 'CA', 'genres': 'Jazz',
+      'image_link': 'https://example.com/sax.png', 'facebook_link': 'https://www.facebook.com/sax'})
+    self.assertEqual(cards(), [('Austin Hall 0', 'The Tame Sax Band', 'https://example.com/sax.png')])
+
+    db.session.execute('TRUNCATE "ShowCard"')
+    rebuild_show_cards()
+    db.session.commit()
+    self.assertEqual(ShowCard.query.count(), 61)
+    db.session.delete(Venue.query.get(venue_id))
+    db.session.commit()
+    self.assertEqual(cards(), [])
+    self.assertEqual(ShowCard.query.count(), 57)
+
+  def test_partitions_take_over_the_shows_of_their_months(self):
+    def placement():
+      return dict(db.session.execute('SELECT tableoid::regclass::text, count(*) FROM "Show" GROUP BY 1').fetchall())
+    self.assertEqual(placement(), {'"Show_default"': 60})
+
+    created, archived = maintain_show_partitions(2)
+    db.session.commit()
+    self.assertEqual((len(created), archived), (3, []))
+    first = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    in_default = Show.query.filter(Show.start_time<first).count()
+    shows = placement()
+    self.assertEqual(shows.pop('"Show_default"'), in_default)
+    self.assertEqual(set(shows), set('"%s"' % name for name in created))
+    self.assertEqual(sum(shows.values()), 60 - in_default)
+    self.assertEqual(ShowCard.query.count(), 60)
+    self.assertEqual(maintain_show_partitions(2), ([], []))
+
+  def test_bulk_removal_deletes_shows_in_the_database(self):
+    venue_ids = [venue.id for venue in Venue.query.filter_by(city='Austin')]
+    db.session.remove()
+    with count_queries() as statements:
+      response = self.client.delete('/venues', json={'ids': venue_ids + [0]})
+    self.assertEqual(response.get_json(), {'removed': venue_ids})
+    # No show is loaded: the cascade, the cards and the area counts all
+    # happen inside the one DELETE.
+    self.assertFalse([statement for statement in statements if 'SELECT' in statement], statements)
+    self.assertEqual(Show.query.count(), 40)
+    self.assertEqual(ShowCard.query.count(), 40)
+    self.assertEqual([area.city for area in Area.query.order_by(Area.city)], ['New York', 'San Francisco'])
+    self.assertEqual(venue_names.search('Austin'), [])
+    self.assertEqual(self.client.delete('/venues', json={'ids': 'all'}).status_code, 400)
+
+    artist_id = Artist.query.one().id
+    db.session.remove()
+    archive = io.StringIO()
+    self.assertEqual(remove('artists', [artist_id], archive=archive), [artist_id])
+    artist, = [json.loads(line) for line in archive.getvalue().splitlines()]
+    self.assertEqual((artist['name'], len(artist['shows'])), ('The Wild Sax Band', 40))
+    self.assertEqual(Show.query.count(), 0)
+
+  def test_show_venue_issues_a_single_statement_after_its_validator(self):
+    venue = Venue.query.filter_by(name='Austin Hall 0').one()
+    venue_id = venue.id
+    db.session.remove()
+    with count_queries() as statements, captured_templates() as templates:
+      response = self.client.get('/venues/%d' % venue_id)
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(len(statements), 2, statements)
+    template, context = templates[0]
+    self.assertEqual(context['venue']['upcoming_shows_count'], 2)
+    self.assertEqual(context['venue']['past_shows_count'], 2)
+    self.assertEqual(context['venue']['upcoming_shows'][0]['artist_name'], 'The Wild Sax Band')
+
+  def test_show_times_are_formatted_in_the_venue_timezone(self):
+    venue = Venue.query.filter_by(name='Austin Hall 0').one()
+    venue.timezone = 'America/Chicago'
+    venue_id = venue.id
+    db.session.commit()
+    with captured_templates() as templates:
+      self.client.get('/venues/%d' % venue_id)
+      self.client.get('/shows?venue_id=%d' % venue_id)
+    for show in templates[0][1]['venue']['upcoming_shows'] + templates[1][1]['shows']:
+      self.assertRegex(show['formatted_start_time'], r' at \d+:\d\d[AP]M C[DS]T$')
+
+  def test_show_artist_issues_a_single_statement_after_its_validator(self):
+    artist_id = Artist.query.one().id
+    db.session.remove()
+    with count_queries() as statements, captured_templates() as templates:
+      response = self.client.get('/artists/%d' % artist_id)
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(len(statements), 2, statements)
+    template, context = templates[0]
+    self.assertEqual(context['artist']['upcoming_shows_count'], 30)
+    self.assertEqual(context['artist']['past_shows_count'], 30)
+
+  def test_missing_detail_pages_are_not_found(self):
+    self.assertEqual(self.client.get('/venues/0').status_code, 404)
+    self.assertEqual(self.client.get('/artists/0').status_code, 404)
+
+  def test_shows_pages_with_a_single_statement_per_page_after_its_validator(self):
+    self.addCleanup(app.config.__setitem__, 'SHOWS_PER_PAGE', app.config['SHOWS_PER_PAGE'])
+    app.config['SHOWS_PER_PAGE'] = 7
+    seen = []
+    url = '/shows'
+    while url:
+      with count_queries() as statements, captured_templates() as templates:
+        response = self.client.get(url)
+      self.assertEqual(response.status_code, 200)
+      self.assertEqual(len(statements), 2, statements)
+      template, context = templates[0]
+      self.assertLessEqual(len(context['shows']), 7)
+      seen.extend(show['start_time'] for show in context['shows'])
+      url = context['next_url']
+    self.assertEqual(len(seen), 60)
+    self.assertEqual(seen, sorted(seen))
+
+  def test_shows_filters(self):
+    venue_id = Venue.query.filter_by(name='Austin Hall 0').one().id
+    db.session.remove()
+    with captured_templates() as templates:
+      self.client.get('/shows?when=upcoming&venue_id=%d' % venue_id)
+      self.client.get('/shows?when=past')
+    upcoming = templates[0][1]['shows']
+    self.assertEqual(len(upcoming), 2)
+    self.assertTrue(all(show['venue_id'] == venue_id for show in upcoming))
+    past = [show['start_time'] for show in templates[1][1]['shows']]
+    self.assertEqual(past, sorted(past, reverse=True))
+
+  def test_shows_rejects_malformed_cursor(self):
+    self.assertEqual(self.client.get('/shows?after=yesterday').status_code, 400)
+
+  def test_calendars_return_the_shows_overlapping_a_range(self):
+    venue_id = Venue.query.filter_by(name='Austin Hall 0').one().id
+    artist_id = Artist.query.one().id
+    db.session.remove()
+    today = datetime.now().date()
+    weeks = '?from=%s&to=%s' % (today - timedelta(days=20), today + timedelta(days=20))
+    with count_queries() as statements:
+      venue = self.client.get('/venues/%d/calendar%s' % (venue_id, weeks)).get_json()
+    self.assertEqual(len(statements), 1, statements)
+    starts = [show['start_time'] for show in venue['shows']]
+    self.assertEqual(len(starts), 4)
+    self.assertEqual(starts, sorted(starts))
+    self.assertEqual({show['artist_name'] for show in venue['shows']}, {'The Wild Sax Band'})
+
+    midnight = datetime.combine(today, datetime.min.time())
+    expected = Show.query.filter(Show.end_time > midnight,
+                                 Show.start_time < midnight + timedelta(days=31)).count()
+    upcoming = self.client.get('/artists/%d/calendar' % artist_id).get_json()
+    self.assertEqual(len(upcoming['shows']), expected)
+
+    self.assertEqual(self.client.get('/venues/0/calendar').status_code, 404)
+    self.assertEqual(self.client.get('/venues/%d/calendar?from=soon' % venue_id).status_code, 400)
+    self.assertEqual(self.client.get('/venues/%d/calendar?from=2030-01-02&to=2030-01-01'
+                                     % venue_id).status_code, 400)
+
+  def test_show_creation_rejects_double_bookings(self):
+    show = Show.query.join(Venue).filter(Venue.name == 'Austin Hall 0').order_by(Show.start_time.desc()).first()
+    venue_id, artist_id, start_time = show.venue_id, show.artist_id, show.start_time
+    other_venue_id = Venue.query.filter_by(name='San Francisco Hall 0').one().id
+    other_artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Jazz'])
+    db.session.add(other_artist)
+    db.session.commit()
+    other_artist_id = other_artist.id
+    db.session.remove()
+
+    def create(**form):
+      return self.client.post('/shows/create', data=dict(
+        {'artist_id': other_artist_id, 'venue_id': venue_id}, **form))
+
+    overlap = (start_time + timedelta(hours=2)).strftime('%Y-%m-%d %H:%M:%S')
+    response = create(start_time=overlap)
+    self.assertEqual(response.status_code, 409)
+    self.assertIn(b'The venue already has a show at that time.', response.data)
+    response = create(artist_id=artist_id, venue_id=other_venue_id, start_time=overlap)
+    self.assertIn(b'The artist is already booked at that time.', response.data)
+    response = create(venue_id=0, start_time=overlap)
+    self.assertIn(b'There is no venue with ID 0.', response.data)
+    response = create(venue_id='', start_time=overlap)
+    self.assertEqual(response.status_code, 400)
+    later = (start_time + timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S')
+    response = create(start_time=later, end_time=overlap)
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(Show.query.count(), 60)
+
+    # Back to back is fine: the ranges are half-open.
+    self.assertEqual(create(start_time=later).status_code, 302)
+    self.assertEqual(Show.query.count(), 61)
+
+  def test_recurring_shows_are_checked_and_inserted_in_bulk(self):
+    venue_id = Venue.query.filter_by(name='Austin Hall 0').one().id
+    other_venue_id = Venue.query.filter_by(name='San Francisco Hall 0').one().id
+    artist_id = Artist.query.one().id
+    db.session.remove()
+
+    def schedule(**form):
+      return self.client.post('/shows/schedule', data=dict(
+        {'artist_id': artist_id, 'venue_id': venue_id, 'frequency': 'weekly'}, **form))
+
+    with count_queries() as statements:
+      response = schedule(start_time='2099-01-02 20:00:00', count=52)
+    self.assertEqual(response.status_code, 302)
+    # The ids, the conflicts and one INSERT for the year.
+    self.assertEqual(len(statements), 3, statements)
+    self.assertEqual(Show.query.filter(Show.start_time>'2099-01-01').count(), 52)
+    self.assertEqual(ShowCard.query.filter(ShowCard.start_time>'2099-12-25').count(), 1)
+
+    response = schedule(venue_id=other_venue_id, start_time='2099-01-31 20:00:00', frequency='monthly',
+                        until='2099-04-30')
+    self.assertEqual(response.status_code, 302)
+    self.assertEqual([show.start_time.day for show in Show.query.filter(Show.venue_id==other_venue_id,
+                                                                         Show.start_time>'2099-01-01')
+                      .order_by(Show.start_time)],
+                     [31, 28, 31, 30])
+
+    # A clash anywhere rejects the whole schedule and names every clash.
+    response = schedule(start_time='2099-01-02 21:00:00', interval=2, count=10)
+    self.assertEqual(response.status_code, 409)
+    self.assertIn(b'10 of the 10 shows clash with existing bookings.', response.data)
+    self.assertIn(b'2099-01-16 21:00: the venue is already booked.', response.data)
+    self.assertEqual(schedule(venue_id=0, start_time='2100-01-01 20:00:00', count=2).status_code, 409)
+    self.assertEqual(schedule(start_time='2100-01-01 20:00:00').status_code, 400)
+    self.assertEqual(schedule(start_time='2100-01-01 20:00:00', count=1000).status_code, 409)
+    self.assertEqual(Show.query.count(), 60 + 52 + 4)
+
+  def test_genre_facets_count_and_filter_the_lists(self):
+    db.session.add(Venue(name='Stone Pony', city='Austin', state='TX', genres=['Rock n Roll', 'Jazz']))
+    db.session.add(Venue(name='Blue Note', city='New York', state='NY', genres=['Blues']))
+    db.session.commit()
+    with captured_templates() as templates:
+      self.client.get('/venues?genre=Rock+n+Roll')
+      self.client.get('/artists?genre=Blues')
+    venues, artists = templates[0][1], templates[1][1]
+    self.assertEqual([venue['name'] for area in venues['areas'] for venue in area['venues']], ['Stone Pony'])
+    self.assertEqual(venues['genres'], [('Jazz', 16), ('Blues', 1), ('Rock n Roll', 1)])
+    self.assertEqual(artists['artists'], [])
+    self.assertEqual(artists['genres'], [('Jazz', 1)])
+
+    both = self.client.get('/venues?genre=Jazz&genre=Rock+n+Roll')
+    self.assertIn(b'Stone Pony', both.data)
+    self.assertNotIn(b'Austin Hall 0', both.data)
+    new_york = self.client.get('/venues/genres?city=New+York&state=NY').get_json()
+    self.assertEqual(new_york['genres'], [{'genre': 'Jazz', 'count': 5}, {'genre': 'Blues', 'count': 1}])
+    self.assertEqual(self.client.get('/venues/genres?city=Nowhere&state=NV').get_json()['genres'], [])
+
+  def test_genre_facets_are_cached_until_a_write(self):
+    self.client.get('/artists')
+    with count_queries() as statements:
+      self.client.get('/artists?genre=Jazz')
+      self.client.get('/artists/genres')
+    self.assertEqual(len(statements), 1, statements)
+
+    self.client.post('/artists/create', data={
+      'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA',
+      'genres': 'Rock n Roll', 'facebook_link': 'https://www.facebook.com/GunsNPetals'})
+    self.client.get('/artists')  # consume the flashed message
+    self.assertEqual(self.client.get('/artists/genres').get_json()['genres'],
+                     [{'genre': 'Jazz', 'count': 1}, {'genre': 'Rock n Roll', 'count': 1}])
+
+  def test_search_venues_ranks_name_matches_above_location_matches(self):
+    db.session.add(Venue(name='Riverside', city='Park City', state='UT', genres=['Jazz']))
+    db.session.add(Venue(name='Parkway Club', city='Denver', state='CO', genres=['Jazz']))
+    db.session.commit()
+    with count_queries() as statements, captured_templates() as templates:
+      self.client.post('/venues/search', data={'search_term': 'par'})
+    self.assertEqual(len(statements), 1, statements)
+    results = templates[0][1]['results']
+    self.assertEqual(results['count'], 2)
+    self.assertEqual([venue['name'] for venue in results['data']], ['Parkway Club', 'Riverside'])
+
+  def test_search_results_are_limited_but_counted(self):
+    self.addCleanup(app.config.__setitem__, 'SEARCH_RESULTS_LIMIT', app.config['SEARCH_RESULTS_LIMIT'])
+    app.config['SEARCH_RESULTS_LIMIT'] = 3
+    with captured_templates() as templates:
+      self.client.post('/venues/search', data={'search_term': 'Hall'})
+      self.client.post('/artists/search', data={'search_term': 'sax CA'})
+    venues = templates[0][1]['results']
+    self.assertEqual(venues['count'], 15)
+    self.assertEqual(len(venues['data']), 3)
+    self.assertEqual(venues['data'][0]['num_upcoming_shows'], 2)
+    artists = templates[1][1]['results']
+    self.assertEqual([artist['name'] for artist in artists['data']], ['The Wild Sax Band'])
+
+  def test_typeahead_answers_from_memory_after_first_load(self):
+    self.client.get('/venues/typeahead?q=aus')
+    with count_queries() as statements:
+      response = self.client.get('/venues/typeahead?q=hall 1')
+    self.assertEqual(statements, [])
+    names = sorted(venue['name'] for venue in response.get_json()['data'])
+    self.assertEqual(names, ['Austin Hall 1', 'New York Hall 1', 'San Francisco Hall 1'])
+
+  def test_typeahead_follows_creates_and_edits(self):
+    self.assertEqual(self.client.get('/artists/typeahead?q=sax').get_json()['data'][0]['name'],
+                     'The Wild Sax Band')
+    form = {'name': 'Guns N Petals', 'city': 'San Francisco', 'state': 'CA',
+            'genres': 'Rock n Roll', 'facebook_link': 'https://www.facebook.com/GunsNPetals'}
+    self.client.post('/artists/create', data=form)
+    artist_id = self.client.get('/artists/typeahead?q=petals').get_json()['data'][0]['id']
+    self.client.post('/artists/%d/edit' % artist_id, data=dict(form, name='Guns N Roses'))
+    self.assertEqual(self.client.get('/artists/typeahead?q=petals').get_json()['data'], [])
+    self.assertEqual(self.client.get('/artists/typeahead?q=gun').get_json()['data'],
+                     [{'id': artist_id, 'name': 'Guns N Roses'}])
+
+  def test_typeahead_reloads_after_writes_from_other_processes(self):
+    index = PrefixIndex(lambda: db.session.query(Venue.id, Venue.name).all(), 'Venue', recheck_seconds=0)
+    self.assertEqual(index.search('hop'), [])
+    # Written without put(), as by another worker or a flask command.
+    db.session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz']))
+    db.session.commit()
+    self.assertEqual([venue['name'] for venue in index.search('hop')], ['The Musical Hop'])
+    with count_queries() as statements:
+      index.search('hop')
+    self.assertEqual(len(statements), 1, statements)
+
+  def test_typeahead_keeps_its_own_writes_without_reloading(self):
+    index = PrefixIndex(lambda: db.session.query(Venue.id, Venue.name).all(), 'Venue', recheck_seconds=0)
+    index.search('hall')
+    venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz'])
+    db.session.add(venue)
+    db.session.commit()
+    index.put(venue.id, venue.name)
+    with count_queries() as statements:
+      self.assertEqual([venue['name'] for venue in index.search('hop')], ['The Musical Hop'])
+    # Only the version check: the index already had the write.
+    self.assertEqual(len(statements), 1, statements)
+
+  def test_typeahead_is_loaded_once_by_concurrent_first_lookups(self):
+    loads = []
+    def load():
+      loads.append(1)
+      time.sleep(0.1)
+      return [(1, 'The Musical Hop')]
+    index = PrefixIndex(load)
+    threads = [threading.Thread(target=index.search, args=('hop',)) for _ in range(4)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(len(loads), 1)
+    self.assertEqual(index.search('hop'), [{'id': 1, 'name': 'The Musical Hop'}])
+
+  def test_cached_pages_are_served_after_their_validator(self):
+    self.client.get('/venues')
+    with count_queries() as statements:
+      response = self.client.get('/venues')
+    # The validator runs first, so a page whose ETag moved is not served.
+    self.assertEqual(len(statements), 1, statements)
+    self.assertIn('"TableVersion"', statements[0])
+    self.assertEqual(response.headers['X-Cache'], 'HIT')
+    self.assertEqual(page_cache.stats()['venues.venues'], {'hits': 1, 'misses': 1})
+
+  def test_local_pages_expire_after_the_timeout(self):
+    # Upcoming and past shows change with the clock, without a write.
+    backend = LocalCache()
+    backend.set('/venues?', 'page', timeout=0.05)
+    self.assertEqual(backend.get('/venues?'), 'page')
+    time.sleep(0.1)
+    self.assertIsNone(backend.get('/venues?'))
+    backend.set('/venues?', 'page')
+    self.assertEqual(backend.get('/venues?'), 'page')
+
+  def test_writes_invalidate_the_pages_that_show_them(self):
+    venue = Venue.query.filter_by(name='Austin Hall 0').one()
+    other = Venue.query.filter_by(name='Austin Hall 1').one()
+    artist_id, venue_id, other_id = Artist.query.one().id, venue.id, other.id
+    db.session.remove()
+    for url in ('/venues/%d' % venue_id, '/venues/%d' % other_id, '/artists'):
+      self.client.get(url)
+
+    self.client.post('/shows/create', data={
+      'artist_id': artist_id, 'venue_id': venue_id, 'start_time': '2099-01-01 20:00:00'})
+    self.client.get('/shows')  # consume the flashed message
+    self.assertEqual(self.client.get('/venues/%d' % venue_id).headers['X-Cache'], 'MISS')
+    # The other venue lists the artist, whose version is part of its ETag.
+    self.assertEqual(self.client.get('/venues/%d' % other_id).headers['X-Cache'], 'MISS')
+    self.assertEqual(self.client.get('/artists').headers['X-Cache'], 'HIT')
+
+    page_cache.invalidate('list:artists')
+    self.assertEqual(self.client.get('/artists').headers['X-Cache'], 'MISS')
+
+  def test_unchanged_pages_are_not_modified(self):
+    venue_id = Venue.query.filter_by(name='Austin Hall 0').one().id
+    db.session.remove()
+    for url in ('/venues', '/venues/%d' % venue_id, '/shows?when=upcoming'):
+      response = self.client.get(url)
+      etag, last_modified = response.headers['ETag'], response.headers['Last-Modified']
+      # Answered from the validator alone, whether or not the page is cached.
+      page_cache.clear()
+      with count_queries() as statements, captured_templates() as templates:
+        response = self.client.get(url, headers={'If-None-Match': etag})
+      self.assertEqual(response.status_code, 304, url)
+      self.assertEqual((len(statements), templates), (1, []), url)
+      response = self.client.get(url, headers={'If-Modified-Since': last_modified})
+      self.assertEqual(response.status_code, 304, url)
+
+  def test_writes_change_the_validators_of_the_pages_that_show_them(self):
+    venue = Venue.query.filter_by(name='Austin Hall 0').one()
+    artist_id, venue_id = Artist.query.one().id, venue.id
+    db.session.remove()
+    urls = ('/venues/%d' % venue_id, '/artists/%d' % artist_id, '/artists', '/shows')
+    etags = dict((url, self.client.get(url).headers['ETag']) for url in urls)
+
+    self.client.post('/shows/create', data={
+      'artist_id': artist_id, 'venue_id': venue_id, 'start_time': '2099-01-01 20:00:00'})
+    self.client.get('/artists')  # consume the flashed message
+    statuses = dict((url, self.client.get(url, headers={'If-None-Match': etags[url]}).status_code)
+                    for url in urls)
+    self.assertEqual(statuses, {urls[0]: 200, urls[1]: 200, urls[2]: 304, urls[3]: 200})
+
+    self.assertEqual(self.client.get('/venues/0', headers={'If-None-Match': etags[urls[0]]}).status_code, 404)
+
+  def test_export_yields_the_csv_header_before_any_statement(self):
+    chunks = export_lines('venues', 'csv')
+    with count_queries() as statements:
+      header = next(chunks)
+    self.assertEqual(statements, [])
+    self.assertEqual(next(csv.reader([header])), [column.name for column in Venue.__table__.columns])
+    chunks.close()
+
+  def test_export_writes_csv_and_ndjson(self):
+    db.session.add(Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz', 'Reggae']))
+    db.session.commit()
+    venues = list(csv.DictReader(io.StringIO(''.join(export_lines('venues', 'csv')))))
+    self.assertEqual(len(venues), 16)
+    # Genres use the separator the importer splits on.
+    self.assertEqual((venues[-1]['name'], venues[-1]['genres']), ('The Musical Hop', 'Jazz;Reggae'))
+
+    first = Show.query.order_by(Show.start_time, Show.id).first()
+    shows = [json.loads(line) for line in ''.join(export_lines('shows', 'ndjson')).splitlines()]
+    self.assertEqual(len(shows), 60)
+    self.assertEqual(shows[0], {
+      'id': first.id, 'start_time': first.start_time.isoformat(), 'end_time': first.end_time.isoformat(),
+      'venue_id': first.venue_id, 'venue_name': first.Venue.name,
+      'artist_id': first.artist_id, 'artist_name': 'The Wild Sax Band', 'artist_image_link': None})
+    self.assertEqual(next(csv.DictReader(io.StringIO(''.join(export_lines('shows', 'csv')))))['start_time'],
+                     first.start_time.isoformat())
+
+  def test_export_yields_a_chunk_per_batch(self):
+    chunks = list(export_lines('shows', 'ndjson', batch_size=25))
+    self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [25, 25, 10])
+    chunks = list(export_lines('shows', 'csv', batch_size=25))
+    self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [1, 25, 25, 10])
+
+  def test_export_route_and_command(self):
+    response = self.client.get('/export/shows.ndjson')
+    self.assertEqual(response.mimetype, 'application/x-ndjson')
+    self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=shows.ndjson')
+    self.assertEqual(len(response.get_data(as_text=True).splitlines()), 60)
+    self.assertEqual(self.client.get('/export/areas.csv').status_code, 404)
+    self.assertEqual(self.client.get('/export/shows.xml').status_code, 404)
+
+    result = app.test_cli_runner().invoke(args=['export', 'venues', '--format', 'csv'])
+    self.assertEqual(result.exit_code, 0, result.output)
+    self.assertEqual(len(list(csv.DictReader(io.StringIO(result.output)))), 15)
+
+
+if __name__ == '__main__':
+  unittest.main()
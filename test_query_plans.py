@@ -0,0 +1,191 @@
+#----------------------------------------------------------------------------#
+# Query plan regression tests.
+#
+# Seeds tens of thousands of venues and artists and a couple hundred thousand
+# shows, replays every read route, EXPLAINs each statement it issued and fails on a
+# sequential scan of a large table the route is not expected to read in full.
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test \
+#     python test_query_plans.py -v
+#----------------------------------------------------------------------------#
+
+import json
+import os
+import random
+import re
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from extensions import page_cache
+from models import db, Venue, Artist, Show
+from partitions import add_months, create_show_partition, month_start, partition_name
+from test_queries import count_queries
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+app = create_app(migrations=False)
+
+VENUES = 20000
+ARTISTS = 20000
+SHOWS = 200000
+LARGE_TABLES = {'Venue', 'Artist', 'Show', 'ShowCard'}
+PARTITION = re.compile(r'_(default|\d{4}_\d{2})$')
+# Two common genres per venue and artist, and 'Other' on one in five hundred.
+GENRES = ['Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk', 'Hip-Hop',
+          'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop', 'Punk', 'R&B', 'Reggae',
+          'Rock n Roll', 'Soul', 'Other']
+
+
+def genres(i):
+  return [GENRES[i % 7], GENRES[7 + i % 11]] + (['Other'] if i % 500 == 0 else [])
+
+
+def scanned(plan, node_type=None):
+  scans = set()
+  if 'Relation Name' in plan and node_type in (None, plan['Node Type']):
+    scans.add(plan['Relation Name'])
+  for child in plan.get('Plans', []):
+    scans |= scanned(child, node_type)
+  return scans
+
+def seq_scans(plan):
+  # Partitions count as the table they belong to.
+  return {PARTITION.sub('', name) for name in scanned(plan, 'Seq Scan')}
+
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, 'TEST_DATABASE_URL is not set')
+class QueryPlanTestCase(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+    db.app = app
+    with app.app_context():
+      db.drop_all()
+      db.create_all()
+      cls.seed()
+
+  @classmethod
+  def tearDownClass(cls):
+    with app.app_context():
+      db.session.remove()
+      db.drop_all()
+
+  @classmethod
+  def seed(cls):
+    # Mostly history: about one show in ten is upcoming.
+    rng = random.Random(7)
+    now = datetime.now()
+    # Monthly partitions over the nine years of history and the year ahead.
+    for months in range(-110, 14):
+      create_show_partition(add_months(month_start(now), months))
+    cities = [('City %d' % i, 'CA') for i in range(200)]
+    db.session.execute(Venue.__table__.insert(), [
+      {'name': 'Venue %d' % i, 'city': cities[i % len(cities)][0], 'state': 'CA',
+       'genres': genres(i)}
+      for i in range(VENUES)])
+    db.session.execute(Artist.__table__.insert(), [
+      {'name': 'Artist %d' % i, 'city': 'City %d' % (i % 200), 'state': 'CA',
+       'genres': genres(i)}
+      for i in range(ARTISTS)])
+    # Three-hour shows on a four-hour grid, never double-booked.
+    taken = set()
+    shows = []
+    while len(shows) < SHOWS:
+      venue_id, artist_id = rng.randint(1, VENUES), rng.randint(1, ARTISTS)
+      slot = rng.randint(-6 * 3300, 6 * 365)
+      if ('venue', venue_id, slot) in taken or ('artist', artist_id, slot) in taken:
+        continue
+      taken.update((('venue', venue_id, slot), ('artist', artist_id, slot)))
+      start_time = now + timedelta(hours=4 * slot)
+      shows.append({'venue_id': venue_id, 'artist_id': artist_id,
+                    'start_time': start_time, 'end_time': start_time + timedelta(hours=3)})
+    db.session.execute(Show.__table__.insert(), shows)
+    db.session.commit()
+    # VACUUM also moves the new rows out of the GIN pending lists, like
+    # autovacuum would; until then the planner avoids the GIN indexes.
+    with db.engine.connect() as connection:
+      connection.execution_options(isolation_level='AUTOCOMMIT').execute('VACUUM ANALYZE')
+
+  def setUp(self):
+    self.client = app.test_client()
+    page_cache.clear()
+
+  def explain(self, statement, parameters):
+    cursor = db.session.connection().connection.cursor()
+    try:
+      cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+      plan = cursor.fetchone()[0]
+    finally:
+      cursor.close()
+    if isinstance(plan, str):
+      plan = json.loads(plan)
+    return plan[0]['Plan']
+
+  def assertNoSeqScan(self, method, url, allowed=(), data=None):
+    with count_queries(with_parameters=True) as statements:
+      response = self.client.open(url, method=method, data=data)
+    self.assertEqual(response.status_code, 200, url)
+    self.assertTrue(statements, url)
+    for statement, parameters in statements:
+      scans = seq_scans(self.explain(statement, parameters)) & LARGE_TABLES
+      self.assertEqual(scans - set(allowed), set(), '%s %s\n%s' % (method, url, statement))
+
+  def test_venues(self):
+    # The landing page reads the area summary only; an area reads its own venues.
+    self.client.get('/venues/genres')
+    self.assertNoSeqScan('GET', '/venues')
+    self.assertNoSeqScan('GET', '/venues?city=City+12&state=CA')
+
+  def test_artists(self):
+    self.assertNoSeqScan('GET', '/artists', allowed={'Artist'})
+
+  def test_genre_filters(self):
+    # The facet counts aggregate every row; rare genres are found with the GIN indexes.
+    self.client.get('/venues/genres')
+    self.client.get('/artists/genres')
+    self.assertNoSeqScan('GET', '/venues?genre=Other')
+    self.assertNoSeqScan('GET', '/artists?genre=Other&genre=Blues')
+
+  def test_show_venue(self):
+    self.assertNoSeqScan('GET', '/venues/42')
+
+  def test_show_artist(self):
+    self.assertNoSeqScan('GET', '/artists/42')
+
+  def test_shows(self):
+    self.assertNoSeqScan('GET', '/shows')
+    self.assertNoSeqScan('GET', '/shows?when=upcoming')
+    self.assertNoSeqScan('GET', '/shows?when=past')
+    self.assertNoSeqScan('GET', '/shows?venue_id=42')
+    self.assertNoSeqScan('GET', '/shows?artist_id=42&when=past')
+    self.assertNoSeqScan('GET', '/shows?after=%s_42' % datetime.now().isoformat())
+
+  def test_upcoming_shows_skip_past_partitions(self):
+    # The filtered venue list counts upcoming shows straight from "Show".
+    with count_queries(with_parameters=True) as statements:
+      self.client.get('/venues?city=City+12&state=CA')
+    this_month = partition_name(month_start(datetime.now()))
+    partitions = set()
+    for statement, parameters in statements:
+      if 'num_upcoming_shows' not in statement:
+        continue
+      partitions |= {name for name in scanned(self.explain(statement, parameters)) if PARTITION.search(name)}
+    self.assertTrue(partitions)
+    self.assertEqual({name for name in partitions if name != 'Show_default' and name < this_month}, set())
+
+  def test_calendars(self):
+    # Served by the gist indexes of the double-booking checks.
+    self.assertNoSeqScan('GET', '/venues/42/calendar')
+    self.assertNoSeqScan('GET', '/artists/42/calendar?from=2020-01-01&to=2021-01-01')
+
+  def test_search(self):
+    self.assertNoSeqScan('POST', '/venues/search', data={'search_term': 'Venue 12'})
+    self.assertNoSeqScan('POST', '/artists/search', data={'search_term': 'Artist 12'})
+
+
+if __name__ == '__main__':
+  unittest.main()
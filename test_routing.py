@@ -0,0 +1,94 @@
+#----------------------------------------------------------------------------#
+# Read-replica routing tests.
+#
+# Needs two scratch databases; the "replica" is seeded with different rows
+# so each response shows which one it was read from:
+#   TEST_DATABASE_URL=postgresql://postgres@localhost:5432/fyyur_test \
+#   TEST_REPLICA_DATABASE_URL=postgresql://postgres@localhost:5433/fyyur_test \
+#     python test_routing.py -v
+#----------------------------------------------------------------------------#
+
+import os
+import unittest
+
+from app import create_app
+from extensions import page_cache
+from models import db, Venue
+from typeahead import venue_names, artist_names
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+TEST_REPLICA_DATABASE_URL = os.environ.get('TEST_REPLICA_DATABASE_URL')
+
+app = create_app(migrations=False)
+
+AUSTIN = '/venues?city=Austin&state=TX'
+
+
+@unittest.skipUnless(TEST_DATABASE_URL and TEST_REPLICA_DATABASE_URL,
+                     'TEST_DATABASE_URL and TEST_REPLICA_DATABASE_URL are not set')
+class ReplicaRoutingTestCase(unittest.TestCase):
+
+  def setUp(self):
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+    app.config['SQLALCHEMY_BINDS'] = {'replica': TEST_REPLICA_DATABASE_URL}
+    self.client = app.test_client()
+    venue_names.reset()
+    artist_names.reset()
+    page_cache.clear()
+
+    with app.app_context():
+      self.replica = db.get_engine(app, bind='replica')
+      for engine, name in ((db.engine, 'Primary Hall'), (self.replica, 'Replica Hall')):
+        db.Model.metadata.drop_all(bind=engine)
+        db.Model.metadata.create_all(bind=engine)
+        engine.execute(Venue.__table__.insert(), name=name, city='Austin', state='TX',
+                       genres=['Jazz'])
+
+  def tearDown(self):
+    with app.app_context():
+      db.session.remove()
+      db.Model.metadata.drop_all(bind=db.engine)
+      db.Model.metadata.drop_all(bind=self.replica)
+    app.config['SQLALCHEMY_BINDS'] = {}
+
+  def test_get_requests_read_from_the_replica(self):
+    self.assertIn(b'Replica Hall', self.client.get('/venues/1').data)
+    self.assertIn(b'Replica Hall', self.client.get(AUSTIN).data)
+
+  def test_searches_read_from_the_replica(self):
+    response = self.client.post('/venues/search', data={'search_term': 'hall'})
+    self.assertIn(b'Replica Hall', response.data)
+    self.assertNotIn(b'Primary Hall', response.data)
+
+  def test_writes_go_to_the_primary_and_pin_the_client_to_it(self):
+    self.client.post('/venues/create', data={
+      'name': 'Fresh Hall', 'city': 'Austin', 'state': 'TX', 'address': '1 Main St',
+      'genres': 'Jazz', 'facebook_link': 'https://www.facebook.com/FreshHall'})
+    with app.app_context():
+      self.assertEqual(Venue.query.count(), 2)
+
+    page = self.client.get(AUSTIN).data
+    self.assertIn(b'Fresh Hall', page)
+    self.assertIn(b'Primary Hall', page)
+
+    page_cache.clear()
+    page = app.test_client().get(AUSTIN).data
+    self.assertIn(b'Replica Hall', page)
+    self.assertNotIn(b'Fresh Hall', page)
+
+    with self.client.session_transaction() as session:
+      session['primary_until'] = 0
+    page_cache.clear()
+    self.assertIn(b'Replica Hall', self.client.get(AUSTIN).data)
+
+  def test_without_a_replica_everything_reads_the_primary(self):
+    app.config['SQLALCHEMY_BINDS'] = {}
+    self.assertIn(b'Primary Hall', self.client.get('/venues/1').data)
+    response = self.client.post('/venues/search', data={'search_term': 'hall'})
+    self.assertIn(b'Primary Hall', response.data)
+
+
+if __name__ == '__main__':
+  unittest.main()
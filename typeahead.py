@@ -0,0 +1,135 @@
+#----------------------------------------------------------------------------#
+# Typeahead.
+#----------------------------------------------------------------------------#
+
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from models import db, Venue, Artist, TableVersion
+
+
+def fold(text):
+  return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+class PrefixIndex(object):
+  """In-process sorted index of names answering prefix lookups with bisect.
+
+  Every word boundary of a name is a key, so "sax" finds "The Wild Sax Band".
+  The index is loaded from the database on first use and then kept current
+  by the write handlers through put() and remove(), after their commit,
+  which also account for the version their write moved. Each worker
+  process holds its own copy, so writes handled by other workers or commands
+  are picked up by comparing the table's "TableVersion" with the loaded
+  one, at most every ``recheck_seconds``, and reloading when it moved.
+  """
+
+  def __init__(self, load, table=None, recheck_seconds=5):
+    self._load = load
+    self._table = table
+    self._recheck_seconds = recheck_seconds
+    self._lock = threading.Lock()
+    self._keys = None
+    self._names = {}
+    self._version = None
+    self._checked = 0
+
+  def _keys_for(self, entity_id, name):
+    words = fold(name).split(' ')
+    return [(' '.join(words[i:]), entity_id) for i in range(len(words)) if words[i]]
+
+  def _table_version(self):
+    return db.session.query(TableVersion.version).filter(TableVersion.name==self._table).scalar()
+
+  def _ensure_loaded(self):
+    keys = self._keys
+    if keys is not None:
+      if self._table is None or time.monotonic() - self._checked < self._recheck_seconds:
+        return
+      self._checked = time.monotonic()
+      if self._table_version() == self._version:
+        return
+    with self._lock:
+      # Another thread loaded the table while this one waited for the lock.
+      if self._keys is not keys:
+        return
+      # Read first, so a write during the load is seen by the next check.
+      version = self._table_version() if self._table is not None else None
+      keys = []
+      names = {}
+      for entity_id, name in self._load():
+        names[entity_id] = name
+        keys.extend(self._keys_for(entity_id, name))
+      keys.sort()
+      self._names = names
+      self._keys = keys
+      self._version = version
+      self._checked = time.monotonic()
+
+  def search(self, prefix, limit=10):
+    prefix = fold(prefix)
+    if not prefix:
+      return []
+    self._ensure_loaded()
+    keys = self._keys
+    results = []
+    seen = set()
+    i = bisect_left(keys, (prefix,))
+    while i < len(keys) and keys[i][0].startswith(prefix) and len(results) < limit:
+      entity_id = keys[i][1]
+      name = self._names.get(entity_id)
+      if name is not None and entity_id not in seen:
+        seen.add(entity_id)
+        results.append({'id': entity_id, 'name': name})
+      i += 1
+    return results
+
+  def put(self, entity_id, name):
+    # Nothing to update before the first lookup; the load will see the row.
+    if self._keys is None:
+      return
+    with self._lock:
+      if self._names.get(entity_id) == name:
+        return
+      self._discard(entity_id)
+      self._names[entity_id] = name
+      for key in self._keys_for(entity_id, name):
+        insort(self._keys, key)
+      self._written()
+
+  def remove(self, *entity_ids):
+    """Drop the rows removed by one statement."""
+    if self._keys is None or not entity_ids:
+      return
+    with self._lock:
+      for entity_id in entity_ids:
+        self._discard(entity_id)
+      self._written()
+
+  def reset(self):
+    with self._lock:
+      self._keys = None
+      self._names = {}
+      self._version = None
+
+  def _written(self):
+    # The write just committed by this worker moved the table's version by
+    # one statement and is already in the index, so it needs no reload. Had
+    # anyone else written since the load, the version is still behind.
+    if self._version is not None:
+      self._version += 1
+
+  def _discard(self, entity_id):
+    name = self._names.pop(entity_id, None)
+    if name is None:
+      return
+    for key in self._keys_for(entity_id, name):
+      i = bisect_left(self._keys, key)
+      if i < len(self._keys) and self._keys[i] == key:
+        del self._keys[i]
+
+
+venue_names = PrefixIndex(lambda: db.session.query(Venue.id, Venue.name).all(), 'Venue')
+artist_names = PrefixIndex(lambda: db.session.query(Artist.id, Artist.name).all(), 'Artist')
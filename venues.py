@@ -0,0 +1,278 @@
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+from itertools import groupby
+
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, abort, jsonify
+
+from conditional import conditional, table_versions, booking_versions
+from dates import format_datetimes
+from extensions import page_cache, replica_router
+from facets import venue_genres, genre_filter
+from models import db, Area, Venue, Artist, Show, ShowCard
+from removal import remove, requested_ids
+from search import find_venues
+from shows import calendar_range, calendar
+from typeahead import venue_names
+
+bp = Blueprint('venues', __name__)
+
+
+def venues_version():
+  # Filtered lists count each venue's upcoming shows themselves, the landing
+  # page reads them from the area summary.
+  if any(request.args.get(key) for key in ('genre', 'city', 'state')):
+    return table_versions('Show', 'Venue', shows_at=datetime.now())
+  return table_versions('Area', 'Show', 'Venue')
+
+def venue_version(venue_id):
+  return booking_versions(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+
+
+@bp.route('/venues')
+@conditional(venues_version)
+@page_cache.cached('list:venues', 'list:shows')
+def venues():
+  genres = request.args.getlist('genre')
+  filters = dict((key, request.args[key]) for key in ('city', 'state') if request.args.get(key))
+  if not genres and not filters:
+    # The landing page only reads the area summary, one row per city; each
+    # area's venues are listed on its own page.
+    areas = [{
+      'city':area.city,
+      'state':area.state,
+      'venue_count':area.venue_count,
+      'num_upcoming_shows':area.upcoming_shows
+    } for area in Area.query.order_by(Area.city, Area.state)]
+    return render_template('pages/venues.html', areas=areas, genres=venue_genres.counts(),
+                           selected_genres=genres, filters=filters)
+
+  # One grouped aggregate for the matching venues; areas are grouped in Python.
+  num_upcoming_shows = db.func.count(Show.id).label('num_upcoming_shows')
+  venues = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, num_upcoming_shows) \
+    .outerjoin(Show, db.and_(Show.venue_id==Venue.id, Show.start_time>datetime.now())) \
+    .filter(*[getattr(Venue, key)==value for key, value in filters.items()])
+  if genres:
+    venues = venues.filter(genre_filter(Venue, genres))
+  venues = venues.group_by(Venue.id) \
+    .order_by(Venue.city, Venue.state, Venue.name) \
+    .all()
+  data = []
+  for (city, state), area_venues in groupby(venues, key=lambda venue: (venue.city, venue.state)):
+    area_venues = [{
+      'id':venue.id,
+      'name':venue.name,
+      'num_upcoming_shows':venue.num_upcoming_shows
+    } for venue in area_venues]
+    data.append({
+      'city':city,
+      'state':state,
+      'venue_count':len(area_venues),
+      'num_upcoming_shows':sum(venue['num_upcoming_shows'] for venue in area_venues),
+      'venues':area_venues
+      })
+  return render_template('pages/venues.html', areas=data, genres=venue_genres.counts(filters.get('city'), filters.get('state')),
+                         selected_genres=genres, filters=filters)
+
+@bp.route('/venues/genres')
+@conditional(lambda: table_versions('Venue'))
+@page_cache.cached('list:venues')
+def venue_genre_counts():
+  counts = venue_genres.counts(request.args.get('city'), request.args.get('state'))
+  return jsonify(genres=[{'genre': genre, 'count': count} for genre, count in counts])
+
+@bp.route('/venues/search', methods=['POST'])
+@replica_router.read_only
+def search_venues():
+  search_term = request.form.get('search_term', '')
+  response = find_venues(search_term, current_app.config['SEARCH_RESULTS_LIMIT'])
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+@bp.route('/venues/typeahead')
+def venue_typeahead():
+  return jsonify(data=venue_names.search(request.args.get('q', '')))
+
+@bp.route('/venues/<int:venue_id>')
+@conditional(venue_version)
+@page_cache.cached('venue:{venue_id}', 'venue:{venue_id}:shows')
+def show_venue(venue_id):
+  # The venue and the cards of its shows come back in one outer join.
+  rows = db.session.query(Venue, ShowCard) \
+    .outerjoin(ShowCard, ShowCard.venue_id==Venue.id) \
+    .filter(Venue.id==venue_id) \
+    .order_by(ShowCard.start_time) \
+    .all()
+  if not rows:
+    abort(404)
+  venue = rows[0][0]
+
+  now = datetime.now()
+  upcoming_shows = []
+  past_shows = []
+  shows = [card for _, card in rows if card is not None]
+  start_times = format_datetimes([show.start_time for show in shows], 'full', [venue.timezone] * len(shows))
+  for show, formatted_start_time in zip(shows, start_times):
+    page_cache.tag('artist:%d' % show.artist_id)
+    show_data = {
+      "artist_id": show.artist_id,
+      "artist_image_link": show.artist_image_link,
+      "artist_name": show.artist_name,
+      "start_time": show.start_time,
+      "formatted_start_time": formatted_start_time
+    }
+    if show.start_time > now:
+      upcoming_shows.append(show_data)
+    elif show.start_time < now:
+      past_shows.append(show_data)
+
+  data = {
+    "id" : venue.id,
+    "name": venue.name,
+    "genres": venue.genres,
+    "address": venue.address,
+    "city":venue.city,
+    "state":venue.state,
+    "phone": venue.phone,
+    "website": venue.website,
+    "facebook_link": venue.facebook_link,
+    "seeking_talent": venue.seeking_talent,
+    "seeking_description": venue.seeking_description,
+    "image_link":venue.image_link,
+    "upcoming_shows": upcoming_shows,
+    "past_shows": past_shows,
+    "past_shows_count": len(past_shows),
+    "upcoming_shows_count": len(upcoming_shows)
+  }
+
+  return render_template('pages/show_venue.html', venue=data)
+
+@bp.route('/venues/<int:venue_id>/calendar')
+@page_cache.cached('venue:{venue_id}', 'venue:{venue_id}:shows')
+def venue_calendar(venue_id):
+  start, end = calendar_range()
+  shows = calendar(Show.venue_id, venue_id, start, end)
+  if not shows and Venue.query.get(venue_id) is None:
+    abort(404)
+  return jsonify({'venue_id': venue_id, 'from': start.isoformat(), 'to': end.isoformat(), 'shows': shows})
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  # WTForms is only imported by the form handlers; list and detail pages
+  # never need it.
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  from forms import VenueForm
+  form = VenueForm(request.form)
+
+  error = False
+  try:
+    venue = Venue(
+      name = form.name.data,
+      city = form.city.data,
+      state = form.state.data,
+      address = form.address.data,
+      phone = form.phone.data,
+      genres = form.genres.data,
+      website = form.website.data,
+      seeking_talent = form.seeking_talent.data,
+      seeking_description = form.seeking_description.data,
+      image_link = form.image_link.data,
+      facebook_link = form.facebook_link.data,
+      timezone = form.timezone.data or None
+    )
+    db.session.add(venue)
+    db.session.commit()
+    venue_id = venue.id
+    venue_names.put(venue.id, venue.name)
+    page_cache.invalidate('list:venues')
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  except:
+    db.session.rollback()
+    error = True
+  finally:
+    db.session.close()
+  if error:
+    flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+    return render_template('pages/home.html')
+  else:
+    return redirect(url_for('venues.show_venue', venue_id=venue.id))
+
+@bp.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+  venue = Venue.query.get(venue_id)
+  if venue is None:
+    abort(404)
+  name = venue.name
+  try:
+    remove('venues', [venue_id])
+  except:
+    flash('An error occurred. Venue ' + str(name) + ' could not be deleted.')
+    abort(500)
+  flash('Venue ' + str(name) + ' successfully deleted.')
+  return render_template('pages/home.html')
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return None
+
+@bp.route('/venues', methods=['DELETE'])
+def delete_venues():
+  # Bulk removal: {"ids": [...]} in one set-based transaction.
+  return jsonify(removed=remove('venues', requested_ids()))
+
+#  Update Venue
+#  ----------------------------------------------------------------
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  venue = db.session.query(Venue).filter(Venue.id == venue_id).all()[0]
+  form = VenueForm(obj=venue) 
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  from forms import VenueForm
+  venue = Venue.query.filter_by(id=venue_id).first()
+  form = VenueForm(request.form)
+  error = False
+  try:
+    venue.name = form.name.data
+    venue.city = form.city.data
+    venue.state = form.state.data
+    venue.address = form.address.data
+    venue.phone = form.phone.data
+    venue.website = form.website.data
+    venue.genres = form.genres.data
+    venue.seeking_talent = form.seeking_talent.data
+    venue.seeking_description = form.seeking_description.data
+    venue.image_link = form.image_link.data
+    venue.facebook_link = form.facebook_link.data
+    venue.timezone = form.timezone.data or None
+    db.session.commit()
+    venue_names.put(venue.id, venue.name)
+    page_cache.invalidate('venue:%d' % venue.id, 'list:venues')
+    flash('Venue ' + request.form['name'] + ' was successfully updated!')
+
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    error = True
+  finally:
+    db.session.close()
+  if error:
+    flash('Unable to update ' + request.form['name'] + '!')
+    abort(500)
+
+  else:
+    return redirect(url_for('venues.show_venue', venue_id=venue_id))
+
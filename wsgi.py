@@ -0,0 +1,44 @@
+#----------------------------------------------------------------------------#
+# WSGI entry point.
+#
+#   SECRET_KEY=... gunicorn wsgi:app      (settings in gunicorn.conf.py)
+#
+# The master imports this module once and forks the workers from it, so
+# the work done here is shared copy-on-write instead of repeated per worker.
+#----------------------------------------------------------------------------#
+
+import os
+
+os.environ.setdefault('FYYUR_CONFIG', 'production')
+
+from app import create_app
+from extensions import static_assets
+from models import db
+from dates import compiled_pattern, locale_for, NAMED_FORMATS
+
+app = create_app(migrations=False)
+
+
+def warm_up(app):
+  # Modules the app imports lazily are loaded here instead of in every worker.
+  import forms
+  # Compile every template up front (and fill the bytecode cache).
+  for name in app.jinja_env.list_templates():
+    app.jinja_env.get_template(name)
+  with app.app_context():
+    try:
+      static_assets.manifest()
+    except FileNotFoundError:
+      raise RuntimeError('The static assets are not built: run `flask build-assets` before starting')
+  locale_for('en_US')
+  for format in NAMED_FORMATS:
+    compiled_pattern(format, False)
+    compiled_pattern(format, True)
+  # A pooled connection must never be shared by two processes: make sure
+  # the master forks without any.
+  with app.app_context():
+    for bind in [None] + list(app.config['SQLALCHEMY_BINDS'] or ()):
+      db.get_engine(app, bind=bind).dispose()
+
+
+warm_up(app)